@@ -1,38 +1,70 @@
 """LangGraph definition for Conditions Agent with streaming support."""
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, AsyncIterator
 from uuid import uuid4
-from langgraph.graph import StateGraph, END
+from langgraph.graph import StateGraph, START, END
 
 from agent.state import AgentState
 from agent.nodes import (
     call_preconditions_node,
+    prefetch_pdf_node,
     transform_output_node,
     call_conditions_ai_node,
     classify_results_node,
-    confidence_router_node,
     auto_approve_node,
     human_review_node,
     store_results_node
 )
 from utils.logging_config import get_logger
+from utils.streaming import buffered
+from utils.result_cache import (
+    result_cache_key, has_cached_result, get_cached_result, store_result
+)
+from services.conditions_ai import conditions_ai_client
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+# Divider for execution start/end log blocks
+_BANNER = "=" * 70
+
+# Max node updates read ahead of the streaming consumer
+STREAM_BUFFER_SIZE = 4
+
+# State fields forwarded to the frontend in streamed updates
+_ALLOWED_KEYS = frozenset({
+    "preconditions_output",
+    "pdf_metadata",
+    "transformed_input",
+    "conditions_ai_output",
+    "fulfilled_conditions",
+    "not_fulfilled_conditions",
+    "final_results",
+    "status",
+    "error",
+})
 
+
+@lru_cache(maxsize=1)
 def create_conditions_agent_graph():
     """
     Create the Conditions Agent LangGraph with streaming support.
     
+    The graph topology is static, so the compiled graph is cached and
+    shared by every execution instead of being rebuilt per request.
+    It is compiled lazily on first use rather than at import time.
+    
     Workflow:
     1. call_preconditions -> Predict conditions from PreConditions API
+       prefetch_pdf -> Fetch S3 metadata for the PDF (runs in parallel)
     2. transform_output -> Transform to Conditions AI format
     3. call_conditions_ai -> Evaluate via Airflow v5 + fetch S3
     4. classify_results -> Split fulfilled vs not fulfilled
-    5. confidence_router -> Route based on classification
+    5. Route based on classification (Command returned by classify_results)
        - auto_approve -> All conditions fulfilled
        - human_review -> Some conditions need RM review
+       - store_results -> Nothing to approve or review (e.g. no relevant documents)
     6. store_results -> Save to database and return final results
     
     Returns:
@@ -45,30 +77,29 @@ def create_conditions_agent_graph():
     
     # Add nodes
     workflow.add_node("call_preconditions", call_preconditions_node)
+    workflow.add_node("prefetch_pdf", prefetch_pdf_node)
     workflow.add_node("transform_output", transform_output_node)
     workflow.add_node("call_conditions_ai", call_conditions_ai_node)
-    workflow.add_node("classify_results", classify_results_node)
+    workflow.add_node(
+        "classify_results",
+        classify_results_node,
+        destinations=("auto_approve", "human_review", "store_results")
+    )
     workflow.add_node("auto_approve", auto_approve_node)
     workflow.add_node("human_review", human_review_node)
     workflow.add_node("store_results", store_results_node)
     
-    # Set entry point
-    workflow.set_entry_point("call_preconditions")
+    # Independent I/O runs in parallel from the start
+    workflow.add_edge(START, "call_preconditions")
+    workflow.add_edge(START, "prefetch_pdf")
     
-    # Linear flow through first 4 nodes
-    workflow.add_edge("call_preconditions", "transform_output")
+    # Join both branches before transforming, then linear flow
+    workflow.add_edge(["call_preconditions", "prefetch_pdf"], "transform_output")
     workflow.add_edge("transform_output", "call_conditions_ai")
     workflow.add_edge("call_conditions_ai", "classify_results")
     
-    # Conditional routing based on classification
-    workflow.add_conditional_edges(
-        "classify_results",
-        confidence_router_node,
-        {
-            "auto_approve": "auto_approve",
-            "human_review": "human_review"
-        }
-    )
+    # classify_results routes itself via Command(goto=...) to one of
+    # auto_approve, human_review or store_results
     
     # Both paths converge to store_results
     workflow.add_edge("auto_approve", "store_results")
@@ -81,11 +112,41 @@ def create_conditions_agent_graph():
     app = workflow.compile()
     
     logger.info("Conditions Agent graph created successfully")
-    logger.info("Graph nodes: call_preconditions -> transform_output -> call_conditions_ai -> classify_results -> (auto_approve|human_review) -> store_results")
+    logger.info("Graph nodes: (call_preconditions|prefetch_pdf) -> transform_output -> call_conditions_ai -> classify_results -> (auto_approve|human_review) -> store_results")
     
     return app
 
 
+def _as_cache_hit(cached_state: Dict[str, Any], execution_id: str, started_at: datetime) -> Dict[str, Any]:
+    """
+    Re-stamp a cached final state for the execution that is returning it.
+    
+    The ID and timings become this execution's, and usage/cost are zeroed
+    (nothing was spent); cached_from_execution_id points at the run that
+    produced the results.
+    """
+    original_metadata = cached_state.get("execution_metadata", {})
+    completed_at = datetime.utcnow()
+    cached_state["execution_metadata"] = {
+        **original_metadata,
+        "execution_id": execution_id,
+        "cached_from_execution_id": original_metadata.get("execution_id"),
+        "started_at": started_at,
+        "completed_at": completed_at,
+        "latency_ms": int((completed_at - started_at).total_seconds() * 1000),
+        "total_tokens": 0,
+        "cost_usd": 0.0,
+        "model_breakdown": {}
+    }
+    final_results = cached_state.get("final_results")
+    if final_results:
+        final_results["execution_id"] = execution_id
+        final_results["cached_from_execution_id"] = original_metadata.get("execution_id")
+        if "usage" in final_results:
+            final_results["usage"] = {key: 0 for key in final_results["usage"]}
+    return cached_state
+
+
 async def run_conditions_agent(
     preconditions_input: Dict[str, Any],
     s3_pdf_path: str
@@ -101,39 +162,51 @@ async def run_conditions_agent(
     Returns:
         Final agent state with results
     """
-    execution_id = str(uuid4())
+    execution_id = uuid4().hex
+    started_at = datetime.utcnow()
     
-    logger.info("=" * 70)
-    logger.info(f"STARTING CONDITIONS AGENT - Execution ID: {execution_id}")
-    logger.info("=" * 70)
-    logger.info(f"Classification: {preconditions_input.get('classification')}")
-    logger.info(f"Loan Program: {preconditions_input.get('loan_program')}")
-    logger.info(f"S3 PDF Path: {s3_pdf_path}")
+    logger.info(_BANNER)
+    logger.info("STARTING CONDITIONS AGENT - Execution ID: %s", execution_id)
+    logger.info(_BANNER)
+    logger.info("Classification: %s", preconditions_input.get('classification'))
+    logger.info("Loan Program: %s", preconditions_input.get('loan_program'))
+    logger.info("S3 PDF Path: %s", s3_pdf_path)
+    
+    # Reuse a completed run for the same input and PDF version, if any. Only a
+    # candidate hit pays the HeadObject up front (to confirm the PDF is unchanged);
+    # on a miss prefetch_pdf fetches it in parallel with PreConditions
+    cache_key = result_cache_key(preconditions_input, s3_pdf_path)
+    pdf_metadata = None
+    if has_cached_result(cache_key):
+        try:
+            pdf_metadata = await conditions_ai_client.head_pdf(s3_pdf_path)
+        except Exception as e:
+            logger.warning("Could not fetch PDF metadata, skipping result cache: %s", e)
+        
+        if pdf_metadata and pdf_metadata.get("etag"):
+            cached_state = get_cached_result(cache_key, pdf_metadata["etag"])
+            if cached_state is not None:
+                logger.info("Returning cached result for Execution ID: %s", execution_id)
+                return _as_cache_hit(cached_state, execution_id, started_at)
     
     # Initialize state
     initial_state: AgentState = {
         "preconditions_input": preconditions_input,
         "s3_pdf_path": s3_pdf_path,
+        "pdf_metadata": pdf_metadata,
         "requires_human_review": False,
         "auto_approved_count": 0,
         "node_outputs": [],
         "status": "running",
         "execution_metadata": {
             "execution_id": execution_id,
-            "started_at": datetime.utcnow(),
-            "total_tokens": 0,
-            "cost_usd": 0.0,
-            "latency_ms": 0,
-            "model_breakdown": {}
+            "started_at": started_at
         }
     }
     
     try:
-        # Create and run graph
-        app = create_conditions_agent_graph()
-        
         # Run the graph (non-streaming)
-        final_state = await app.ainvoke(initial_state)
+        final_state = await create_conditions_agent_graph().ainvoke(initial_state)
         
         # Update execution metadata
         final_state["execution_metadata"]["completed_at"] = datetime.utcnow()
@@ -144,18 +217,22 @@ async def run_conditions_agent(
         total_latency_ms = int((completed_at - started_at).total_seconds() * 1000)
         final_state["execution_metadata"]["latency_ms"] = total_latency_ms
         
-        logger.info("=" * 70)
-        logger.info(f"CONDITIONS AGENT COMPLETED - Execution ID: {execution_id}")
-        logger.info("=" * 70)
-        logger.info(f"Status: {final_state.get('status')}")
-        logger.info(f"Auto-approved: {final_state.get('auto_approved_count', 0)}")
-        logger.info(f"Requires review: {final_state.get('requires_human_review', False)}")
-        logger.info(f"Total latency: {total_latency_ms}ms")
+        logger.info(_BANNER)
+        logger.info("CONDITIONS AGENT COMPLETED - Execution ID: %s", execution_id)
+        logger.info(_BANNER)
+        logger.info("Status: %s", final_state.get('status'))
+        logger.info("Auto-approved: %s", final_state.get('auto_approved_count', 0))
+        logger.info("Requires review: %s", final_state.get('requires_human_review', False))
+        logger.info("Total latency: %sms", total_latency_ms)
+        
+        pdf_etag = (final_state.get("pdf_metadata") or {}).get("etag")
+        if pdf_etag and final_state.get("status") != "failed":
+            store_result(cache_key, pdf_etag, final_state)
         
         return final_state
         
     except Exception as e:
-        logger.error(f"Error running Conditions Agent: {e}", exc_info=True)
+        logger.error("Error running Conditions Agent: %s", e, exc_info=True)
         raise
 
 
@@ -177,11 +254,11 @@ async def run_conditions_agent_streaming(
     Yields:
         Dict with node name, status, timestamp, and output after each node
     """
-    execution_id = str(uuid4())
+    execution_id = uuid4().hex
     
-    logger.info("=" * 70)
-    logger.info(f"STARTING CONDITIONS AGENT (STREAMING) - Execution ID: {execution_id}")
-    logger.info("=" * 70)
+    logger.info(_BANNER)
+    logger.info("STARTING CONDITIONS AGENT (STREAMING) - Execution ID: %s", execution_id)
+    logger.info(_BANNER)
     
     # Initialize state
     initial_state: AgentState = {
@@ -193,25 +270,22 @@ async def run_conditions_agent_streaming(
         "status": "running",
         "execution_metadata": {
             "execution_id": execution_id,
-            "started_at": datetime.utcnow(),
-            "total_tokens": 0,
-            "cost_usd": 0.0,
-            "latency_ms": 0,
-            "model_breakdown": {}
+            "started_at": datetime.utcnow()
         }
     }
     
     try:
-        # Create graph
-        app = create_conditions_agent_graph()
-        
-        # Stream events using astream
-        async for event in app.astream(initial_state):
+        # Stream events using astream; buffer a few events ahead so the next
+        # node keeps running while the caller writes the previous one
+        async for event in buffered(create_conditions_agent_graph().astream(initial_state), STREAM_BUFFER_SIZE):
             # Each event is a dict with node name as key
-            node_name = list(event.keys())[0]
-            node_state = event[node_name]
+            node_name = next(iter(event))
+            node_state = event[node_name] or {}
+            
+            logger.info("Streaming update from node: %s", node_name)
             
-            logger.info(f"Streaming update from node: {node_name}")
+            # Include only the relevant fields this node actually wrote
+            state_payload = {k: node_state[k] for k in node_state.keys() & _ALLOWED_KEYS}
             
             # Yield the update to frontend
             yield {
@@ -219,25 +293,15 @@ async def run_conditions_agent_streaming(
                 "status": "completed",
                 "timestamp": datetime.utcnow().isoformat(),
                 "execution_id": execution_id,
-                "state": {
-                    # Include relevant fields for frontend
-                    "preconditions_output": node_state.get("preconditions_output"),
-                    "transformed_input": node_state.get("transformed_input"),
-                    "conditions_ai_output": node_state.get("conditions_ai_output"),
-                    "fulfilled_conditions": node_state.get("fulfilled_conditions"),
-                    "not_fulfilled_conditions": node_state.get("not_fulfilled_conditions"),
-                    "final_results": node_state.get("final_results"),
-                    "status": node_state.get("status"),
-                    "error": node_state.get("error")
-                }
+                "state": state_payload
             }
         
-        logger.info("=" * 70)
-        logger.info(f"CONDITIONS AGENT STREAMING COMPLETE - Execution ID: {execution_id}")
-        logger.info("=" * 70)
+        logger.info(_BANNER)
+        logger.info("CONDITIONS AGENT STREAMING COMPLETE - Execution ID: %s", execution_id)
+        logger.info(_BANNER)
         
     except Exception as e:
-        logger.error(f"Error in streaming execution: {e}", exc_info=True)
+        logger.error("Error in streaming execution: %s", e, exc_info=True)
         
         # Yield error event
         yield {
@@ -249,5 +313,8 @@ async def run_conditions_agent_streaming(
         }
 
 
-# Create global graph instance
-conditions_agent_graph = create_conditions_agent_graph()
+def __getattr__(name: str):
+    """Compile the global graph instance lazily on first access, not at import."""
+    if name == "conditions_agent_graph":
+        return create_conditions_agent_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
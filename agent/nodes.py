@@ -1,7 +1,8 @@
 """LangGraph node implementations for Conditions Agent."""
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
-from uuid import uuid4
+
+from langgraph.types import Command
 
 from agent.state import AgentState
 from services.preconditions import preconditions_client
@@ -13,11 +14,11 @@ from utils.transformers import (
 )
 from utils.tracing import trace_agent_execution
 from utils.logging_config import get_logger
-from database.repository import ConditionsRepository
-from config.settings import settings
 
 logger = get_logger(__name__)
-repository = ConditionsRepository()
+
+# Divider around each node's log block
+_NODE_BANNER = "=" * 50
 
 
 @trace_agent_execution(name="call_preconditions")
@@ -28,28 +29,28 @@ async def call_preconditions_node(state: AgentState) -> Dict[str, Any]:
     Input: preconditions_input (includes Rack & Stack data)
     Output: preconditions_output (streamed to frontend)
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: call_preconditions")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     preconditions_input = state["preconditions_input"]
     
-    logger.info(f"Calling PreConditions API")
-    logger.info(f"Classification: {preconditions_input.get('classification')}")
-    logger.info(f"Loan Program: {preconditions_input.get('loan_program')}")
+    logger.info("Calling PreConditions API")
+    logger.info("Classification: %s", preconditions_input.get('classification'))
+    logger.info("Loan Program: %s", preconditions_input.get('loan_program'))
     
     try:
         # Call PreConditions LangGraph Cloud API
         result = await preconditions_client.predict_conditions(preconditions_input)
         
         logger.info("PreConditions API call successful")
-        logger.info(f"Compartments found: {len(result.get('compartments', []))}")
-        logger.info(f"Deficient conditions: {len(result.get('deficient_conditions', []))}")
+        logger.info("Compartments found: %d", len(result.get('compartments', [])))
+        logger.info("Deficient conditions: %d", len(result.get('deficient_conditions', [])))
         
         # Update state with output (will be streamed)
         return {
             "preconditions_output": result,
-            "node_outputs": state.get("node_outputs", []) + [{
+            "node_outputs": [{
                 "node": "call_preconditions",
                 "completed_at": datetime.utcnow().isoformat(),
                 "output_summary": f"{len(result.get('deficient_conditions', []))} conditions predicted"
@@ -57,13 +58,54 @@ async def call_preconditions_node(state: AgentState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Error in call_preconditions_node: {e}", exc_info=True)
+        logger.error("Error in call_preconditions_node: %s", e, exc_info=True)
         return {
             "error": f"PreConditions API failed: {str(e)}",
             "status": "failed"
         }
 
 
+@trace_agent_execution(name="prefetch_pdf")
+async def prefetch_pdf_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Fetch S3 metadata for the uploaded PDF.
+
+    Runs in parallel with call_preconditions so the S3 round-trip overlaps
+    the PreConditions API call. Must not write status/error, since both
+    branches update state in the same step.
+    """
+    logger.info(_NODE_BANNER)
+    logger.info("NODE: prefetch_pdf")
+    logger.info(_NODE_BANNER)
+
+    s3_pdf_path = state["s3_pdf_path"]
+
+    # Already fetched by the caller (e.g. for the result cache lookup)
+    if state.get("pdf_metadata"):
+        logger.info("PDF metadata already present, skipping HeadObject")
+        return {}
+
+    try:
+        pdf_metadata = await conditions_ai_client.head_pdf(s3_pdf_path)
+
+        logger.info("PDF found: s3://%s/%s", pdf_metadata['bucket'], pdf_metadata['key'])
+        logger.info("Size: %s bytes, ETag: %s", pdf_metadata['content_length'], pdf_metadata['etag'])
+
+        return {
+            "pdf_metadata": pdf_metadata,
+            "node_outputs": [{
+                "node": "prefetch_pdf",
+                "completed_at": datetime.utcnow().isoformat(),
+                "output_summary": f"PDF found ({pdf_metadata['content_length']} bytes)"
+            }]
+        }
+
+    except Exception as e:
+        # Not fatal: Airflow reads the PDF itself and will report a missing file
+        logger.warning("Could not prefetch PDF metadata for %s: %s", s3_pdf_path, e)
+        return {"pdf_metadata": None}
+
+
 @trace_agent_execution(name="transform_output")
 async def transform_output_node(state: AgentState) -> Dict[str, Any]:
     """
@@ -72,9 +114,9 @@ async def transform_output_node(state: AgentState) -> Dict[str, Any]:
     This is a critical transformation that bridges the two APIs.
     Output will be streamed to frontend.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: transform_output")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     preconditions_output = state["preconditions_output"]
     s3_pdf_path = state["s3_pdf_path"]
@@ -89,13 +131,13 @@ async def transform_output_node(state: AgentState) -> Dict[str, Any]:
         )
         
         conditions_count = len(transformed["conf"]["conditions"])
-        logger.info(f"Transformation complete: {conditions_count} conditions prepared for AI")
-        logger.info(f"Output destination: {transformed['conf']['output_destination']}")
+        logger.info("Transformation complete: %s conditions prepared for AI", conditions_count)
+        logger.info("Output destination: %s", transformed['conf']['output_destination'])
         
         # Update state (will be streamed)
         return {
             "transformed_input": transformed,
-            "node_outputs": state.get("node_outputs", []) + [{
+            "node_outputs": [{
                 "node": "transform_output",
                 "completed_at": datetime.utcnow().isoformat(),
                 "output_summary": f"{conditions_count} conditions transformed"
@@ -103,7 +145,7 @@ async def transform_output_node(state: AgentState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Error in transform_output_node: {e}", exc_info=True)
+        logger.error("Error in transform_output_node: %s", e, exc_info=True)
         return {
             "error": f"Transformation failed: {str(e)}",
             "status": "failed"
@@ -117,14 +159,31 @@ async def call_conditions_ai_node(state: AgentState) -> Dict[str, Any]:
     
     This triggers the DAG, polls for completion, and fetches results from S3.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: call_conditions_ai")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     transformed_input = state["transformed_input"]
+    conditions_count = len(transformed_input['conf']['conditions'])
+    
+    # Nothing to evaluate - skip the DAG run entirely
+    if not conditions_count:
+        logger.info("No conditions to evaluate - skipping Conditions AI")
+        return {
+            "conditions_ai_output": {
+                "processed_conditions": [],
+                "api_usage_summary": {},
+                "processing_status": "completed"
+            },
+            "node_outputs": [{
+                "node": "call_conditions_ai",
+                "completed_at": datetime.utcnow().isoformat(),
+                "output_summary": "No conditions to evaluate"
+            }]
+        }
     
     logger.info("Calling Conditions AI (Airflow v5)")
-    logger.info(f"Evaluating {len(transformed_input['conf']['conditions'])} conditions")
+    logger.info("Evaluating %d conditions", conditions_count)
     
     try:
         # This method handles: trigger -> poll -> fetch S3
@@ -134,19 +193,19 @@ async def call_conditions_ai_node(state: AgentState) -> Dict[str, Any]:
         api_usage = result.get('api_usage_summary', {})
         
         logger.info("Conditions AI evaluation complete")
-        logger.info(f"Processed {len(processed_conditions)} conditions")
-        logger.info(f"Status: {result.get('processing_status')}")
+        logger.info("Processed %d conditions", len(processed_conditions))
+        logger.info("Status: %s", result.get('processing_status'))
         
         if api_usage:
             condition_analysis = api_usage.get('condition_analysis', {})
-            logger.info(f"Total tokens: {condition_analysis.get('total_tokens', 0)}")
-            logger.info(f"Total cost: ${condition_analysis.get('total_cost_usd', 0):.4f}")
-            logger.info(f"Total latency: {condition_analysis.get('total_latency_ms', 0)}ms")
+            logger.info("Total tokens: %s", condition_analysis.get('total_tokens', 0))
+            logger.info("Total cost: $%.4f", condition_analysis.get('total_cost_usd', 0))
+            logger.info("Total latency: %sms", condition_analysis.get('total_latency_ms', 0))
         
         # Update state (will be streamed)
         return {
             "conditions_ai_output": result,
-            "node_outputs": state.get("node_outputs", []) + [{
+            "node_outputs": [{
                 "node": "call_conditions_ai",
                 "completed_at": datetime.utcnow().isoformat(),
                 "output_summary": f"{len(processed_conditions)} conditions evaluated"
@@ -154,24 +213,53 @@ async def call_conditions_ai_node(state: AgentState) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Error in call_conditions_ai_node: {e}", exc_info=True)
+        logger.error("Error in call_conditions_ai_node: %s", e, exc_info=True)
         return {
             "error": f"Conditions AI failed: {str(e)}",
             "status": "failed"
         }
 
 
+def _route_after_classification(
+    requires_review: bool,
+    fulfilled: List[Dict[str, Any]],
+    not_fulfilled: List[Dict[str, Any]]
+) -> str:
+    """
+    Route based on whether human review is needed.
+    
+    Returns:
+        - "auto_approve" if all conditions fulfilled
+        - "human_review" if any conditions not fulfilled
+        - "store_results" if the selected branch has no conditions to act on
+    """
+    branch_conditions = not_fulfilled if requires_review else fulfilled
+    
+    if not branch_conditions:
+        logger.info("No conditions to approve or review - routing to store_results")
+        return "store_results"
+    elif requires_review:
+        logger.info("Routing to human_review (some conditions not fulfilled)")
+        return "human_review"
+    else:
+        logger.info("Routing to auto_approve (all conditions fulfilled)")
+        return "auto_approve"
+
+
 @trace_agent_execution(name="classify_results")
-async def classify_results_node(state: AgentState) -> Dict[str, Any]:
+async def classify_results_node(state: AgentState) -> Command:
     """
-    Classify conditions into fulfilled vs not fulfilled.
+    Classify conditions into fulfilled vs not fulfilled and route.
     
     Fulfilled conditions will be auto-approved.
     Not fulfilled conditions need RM review.
+    
+    Routing is returned as a Command so no separate router step is
+    scheduled between classification and the selected branch.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: classify_results")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     conditions_ai_output = state["conditions_ai_output"]
     
@@ -181,69 +269,58 @@ async def classify_results_node(state: AgentState) -> Dict[str, Any]:
     processing_status = conditions_ai_output.get('processing_status')
     if processing_status == 'completed_no_relevant_documents':
         logger.info("No relevant documents found - skipping classification")
-        return {
-            "fulfilled_conditions": [],
-            "not_fulfilled_conditions": [],
-            "requires_human_review": False,
-            "auto_approved_count": 0,
-            "node_outputs": state.get("node_outputs", []) + [{
-                "node": "classify_results",
-                "completed_at": datetime.utcnow().isoformat(),
-                "output_summary": "No relevant documents found"
-            }]
-        }
+        return Command(
+            goto=_route_after_classification(False, [], []),
+            update={
+                "fulfilled_conditions": [],
+                "not_fulfilled_conditions": [],
+                "requires_human_review": False,
+                "auto_approved_count": 0,
+                "node_outputs": [{
+                    "node": "classify_results",
+                    "completed_at": datetime.utcnow().isoformat(),
+                    "output_summary": "No relevant documents found"
+                }]
+            }
+        )
     
     try:
         # Extract fulfilled and not fulfilled conditions
         fulfilled, not_fulfilled = extract_fulfilled_and_not_fulfilled(conditions_ai_output)
+        fulfilled_count = len(fulfilled)
+        not_fulfilled_count = len(not_fulfilled)
         
-        logger.info(f"Fulfilled: {len(fulfilled)} conditions")
-        logger.info(f"Not Fulfilled: {len(not_fulfilled)} conditions")
+        logger.info("Fulfilled: %d conditions", fulfilled_count)
+        logger.info("Not Fulfilled: %d conditions", not_fulfilled_count)
         
         # Determine if human review is needed
-        requires_human_review = len(not_fulfilled) > 0
+        requires_human_review = not_fulfilled_count > 0
         
-        # Update state (will be streamed)
-        return {
-            "fulfilled_conditions": fulfilled,
-            "not_fulfilled_conditions": not_fulfilled,
-            "requires_human_review": requires_human_review,
-            "auto_approved_count": len(fulfilled),
-            "node_outputs": state.get("node_outputs", []) + [{
-                "node": "classify_results",
-                "completed_at": datetime.utcnow().isoformat(),
-                "output_summary": f"{len(fulfilled)} fulfilled, {len(not_fulfilled)} need review"
-            }]
-        }
+        # Update state (will be streamed) and route to the next node
+        return Command(
+            goto=_route_after_classification(requires_human_review, fulfilled, not_fulfilled),
+            update={
+                "fulfilled_conditions": fulfilled,
+                "not_fulfilled_conditions": not_fulfilled,
+                "requires_human_review": requires_human_review,
+                "auto_approved_count": fulfilled_count,
+                "node_outputs": [{
+                    "node": "classify_results",
+                    "completed_at": datetime.utcnow().isoformat(),
+                    "output_summary": f"{fulfilled_count} fulfilled, {not_fulfilled_count} need review"
+                }]
+            }
+        )
         
     except Exception as e:
-        logger.error(f"Error in classify_results_node: {e}", exc_info=True)
-        return {
-            "error": f"Classification failed: {str(e)}",
-            "status": "failed"
-        }
-
-
-def confidence_router_node(state: AgentState) -> str:
-    """
-    Route based on whether human review is needed.
-    
-    Returns:
-        - "auto_approve" if all conditions fulfilled
-        - "human_review" if any conditions not fulfilled
-    """
-    logger.info("=" * 50)
-    logger.info("NODE: confidence_router")
-    logger.info("=" * 50)
-    
-    requires_review = state.get("requires_human_review", False)
-    
-    if requires_review:
-        logger.info("Routing to human_review (some conditions not fulfilled)")
-        return "human_review"
-    else:
-        logger.info("Routing to auto_approve (all conditions fulfilled)")
-        return "auto_approve"
+        logger.error("Error in classify_results_node: %s", e, exc_info=True)
+        return Command(
+            goto="store_results",
+            update={
+                "error": f"Classification failed: {str(e)}",
+                "status": "failed"
+            }
+        )
 
 
 @trace_agent_execution(name="auto_approve")
@@ -251,22 +328,16 @@ async def auto_approve_node(state: AgentState) -> Dict[str, Any]:
     """
     Auto-approve fulfilled conditions.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: auto_approve")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     fulfilled_conditions = state.get("fulfilled_conditions", [])
     
-    logger.info(f"Auto-approving {len(fulfilled_conditions)} fulfilled conditions")
-    
-    # Format for frontend
-    formatted_conditions = [
-        format_condition_for_frontend(cond, is_fulfilled=True)
-        for cond in fulfilled_conditions
-    ]
+    logger.info("Auto-approving %d fulfilled conditions", len(fulfilled_conditions))
     
     return {
-        "node_outputs": state.get("node_outputs", []) + [{
+        "node_outputs": [{
             "node": "auto_approve",
             "completed_at": datetime.utcnow().isoformat(),
             "output_summary": f"{len(fulfilled_conditions)} conditions auto-approved"
@@ -279,22 +350,16 @@ async def human_review_node(state: AgentState) -> Dict[str, Any]:
     """
     Mark not fulfilled conditions for human review.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: human_review")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     not_fulfilled_conditions = state.get("not_fulfilled_conditions", [])
     
-    logger.info(f"Marking {len(not_fulfilled_conditions)} conditions for RM review")
-    
-    # Format for frontend
-    formatted_conditions = [
-        format_condition_for_frontend(cond, is_fulfilled=False)
-        for cond in not_fulfilled_conditions
-    ]
+    logger.info("Marking %d conditions for RM review", len(not_fulfilled_conditions))
     
     return {
-        "node_outputs": state.get("node_outputs", []) + [{
+        "node_outputs": [{
             "node": "human_review",
             "completed_at": datetime.utcnow().isoformat(),
             "output_summary": f"{len(not_fulfilled_conditions)} conditions need RM review"
@@ -307,9 +372,9 @@ async def store_results_node(state: AgentState) -> Dict[str, Any]:
     """
     Store final results to PostgreSQL and prepare final response.
     """
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     logger.info("NODE: store_results")
-    logger.info("=" * 50)
+    logger.info(_NODE_BANNER)
     
     fulfilled_conditions = state.get("fulfilled_conditions", [])
     not_fulfilled_conditions = state.get("not_fulfilled_conditions", [])
@@ -322,13 +387,16 @@ async def store_results_node(state: AgentState) -> Dict[str, Any]:
     processing_status = conditions_ai_output.get('processing_status')
     is_no_relevant_docs = processing_status == 'completed_no_relevant_documents'
     
+    # One timestamp for both the final results and the node output entry
+    now_iso = datetime.utcnow().isoformat()
+    
     if is_no_relevant_docs:
         logger.info("No relevant documents found - preparing special result")
         final_results = {
             "execution_id": execution_metadata.get("execution_id"),
             "trace_id": execution_metadata.get("trace_id"),
             "status": "completed_no_relevant_documents",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now_iso,
             "summary": {
                 "total_conditions": 0,
                 "fulfilled": 0,
@@ -344,14 +412,17 @@ async def store_results_node(state: AgentState) -> Dict[str, Any]:
             "note": conditions_ai_output.get('message', 'No relevant documents found')
         }
     else:
-        # Normal processing - format conditions
-        all_conditions = []
-        
-        for cond in fulfilled_conditions:
-            all_conditions.append(format_condition_for_frontend(cond, is_fulfilled=True))
-        
-        for cond in not_fulfilled_conditions:
-            all_conditions.append(format_condition_for_frontend(cond, is_fulfilled=False))
+        # Normal processing - format conditions in one pass, fulfilled first
+        fulfilled_count = len(fulfilled_conditions)
+        not_fulfilled_count = len(not_fulfilled_conditions)
+        all_conditions = [
+            format_condition_for_frontend(cond, is_fulfilled=True)
+            for cond in fulfilled_conditions
+        ]
+        all_conditions.extend(
+            format_condition_for_frontend(cond, is_fulfilled=False)
+            for cond in not_fulfilled_conditions
+        )
         
         # Calculate totals
         api_usage = conditions_ai_output.get('api_usage_summary', {})
@@ -361,13 +432,13 @@ async def store_results_node(state: AgentState) -> Dict[str, Any]:
             "execution_id": execution_metadata.get("execution_id"),
             "trace_id": execution_metadata.get("trace_id"),
             "status": "completed",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now_iso,
             "summary": {
-                "total_conditions": len(all_conditions),
-                "fulfilled": len(fulfilled_conditions),
-                "not_fulfilled": len(not_fulfilled_conditions),
-                "auto_approved": len(fulfilled_conditions),
-                "requires_review": len(not_fulfilled_conditions)
+                "total_conditions": fulfilled_count + not_fulfilled_count,
+                "fulfilled": fulfilled_count,
+                "not_fulfilled": not_fulfilled_count,
+                "auto_approved": fulfilled_count,
+                "requires_review": not_fulfilled_count
             },
             "conditions": all_conditions,
             "usage": {
@@ -379,19 +450,42 @@ async def store_results_node(state: AgentState) -> Dict[str, Any]:
             "workflow_info": conditions_ai_output.get('workflow_info', {})
         }
     
-    logger.info(f"Final results prepared: {final_results.get('summary', {}).get('total_conditions', 0)} total conditions")
-    logger.info(f"Auto-approved: {final_results.get('summary', {}).get('fulfilled', 0)}")
-    logger.info(f"Needs review: {final_results.get('summary', {}).get('not_fulfilled', 0)}")
+    summary = final_results["summary"]
+    logger.info("Final results prepared: %s total conditions", summary["total_conditions"])
+    logger.info("Auto-approved: %s", summary["fulfilled"])
+    logger.info("Needs review: %s", summary["not_fulfilled"])
+    
+    # Usage totals are only known now; seed them here rather than carrying
+    # zeroed fields through every step from the initial state
+    api_usage = conditions_ai_output.get('api_usage_summary', {})
+    usage_totals = api_usage.get('condition_analysis', {})
+    started_at = execution_metadata.get("started_at")
+    # Only the new keys; the execution_metadata reducer merges them in
+    usage_metadata = {
+        "total_tokens": usage_totals.get('total_tokens', 0),
+        "cost_usd": usage_totals.get('total_cost_usd', 0.0),
+        "latency_ms": int((datetime.utcnow() - started_at).total_seconds() * 1000) if started_at else 0,
+        "model_breakdown": {
+            stage: usage.get('total_tokens', 0)
+            for stage, usage in api_usage.items()
+            if isinstance(usage, dict)
+        }
+    }
     
     # TODO: Store to PostgreSQL
-    # await repository.store_execution(...)
+    # await db_repository.update_execution_status(...)
+    
+    # Keep a failure from an earlier node; otherwise mirror the final results
+    # (completed, or completed_no_relevant_documents on the empty branch)
+    status = "failed" if state.get("status") == "failed" else final_results["status"]
     
     return {
         "final_results": final_results,
-        "status": "completed",
-        "node_outputs": state.get("node_outputs", []) + [{
+        "execution_metadata": usage_metadata,
+        "status": status,
+        "node_outputs": [{
             "node": "store_results",
-            "completed_at": datetime.utcnow().isoformat(),
+            "completed_at": now_iso,
             "output_summary": "Results stored successfully"
         }]
     }
@@ -1,20 +1,90 @@
 """Planner, worker, solver, and store nodes for the ReWOO agent."""
 from __future__ import annotations
 
-import json
+import asyncio
+import re
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 from uuid import uuid4
 
+import orjson
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langgraph.config import get_stream_writer
+
 from agent.rewoo_state import ReWOOEvidence, ReWOOPlan, ReWOOPlanStep, ReWOOState
-from agent.tools import ConditionsAgentTools
+from agent.tools import conditions_agent_tools
 from config.llm import planner_llm, solver_llm
+from config.settings import settings
 from utils.logging_config import get_logger
 from utils.transformers import extract_fulfilled_and_not_fulfilled, format_condition_for_frontend
 from utils.tracing import trace_agent_execution
 
 logger = get_logger(__name__)
 
+_PLANNER_SYSTEM_PROMPT = (
+    "You are a smart loan evaluation agent. Analyze the user's instructions and choose the RIGHT tools.\n\n"
+    
+    "AVAILABLE TOOLS:\n"
+    "1. call_preconditions_api(metadata)\n"
+    "   - Use when: User asks to predict/identify deficient conditions or determine what's missing\n"
+    "   - Requires: Loan metadata (borrower info, loan program, documents)\n"
+    "   - Returns: List of predicted deficient conditions\n\n"
+    
+    "2. call_conditions_ai_api(conditions, documents)\n"
+    "   - Use when: User asks to evaluate if documents satisfy specific conditions\n"
+    "   - Requires: List of conditions to check + S3 document paths\n"
+    "   - Returns: Fulfillment status for each condition\n"
+    "   - Note: Can use output from call_preconditions_api or accept conditions directly\n\n"
+    
+    "3. retrieve_s3_document(s3_path)\n"
+    "   - Use when: User asks to check S3 access or retrieve document metadata\n"
+    "   - Requires: S3 path (s3://bucket/key)\n"
+    "   - Returns: Document metadata and access status\n\n"
+    
+    "4. query_database(query)\n"
+    "   - Use when: User asks for historical data or past evaluations\n"
+    "   - Returns: Historical loan evaluation data\n\n"
+    
+    "DECISION RULES:\n"
+    "- If user asks ONLY about deficiencies → call_preconditions_api only\n"
+    "- If user asks ONLY about document validation → call_conditions_ai_api only\n"
+    "- If user asks for FULL evaluation → call_preconditions_api THEN call_conditions_ai_api\n"
+    "- If user asks about S3 access → retrieve_s3_document only\n"
+    "- Always choose the MINIMUM tools needed to answer the user's question\n\n"
+    
+    "Respond with JSON object containing:\n"
+    "{\n"
+    "  \"summary\": \"Brief explanation of your plan\",\n"
+    "  \"steps\": [\n"
+    "    {\n"
+    "      \"id\": \"step_1\",\n"
+    "      \"tool\": \"tool_name\",\n"
+    "      \"description\": \"What this step does\",\n"
+    "      \"input\": {}\n"
+    "    }\n"
+    "  ]\n"
+    "}"
+)
+
+_SOLVER_SYSTEM_PROMPT = (
+    "You are the solver for a loan-conditions evaluation agent. Using the plan and evidence, "
+    "summarise the outcome of the evaluation. Provide:\n"
+    "1. A concise summary.\n"
+    "2. Key findings (fulfilled vs not fulfilled conditions).\n"
+    "3. Any missing information or follow-up actions."
+)
+
+# Markdown code fence (with optional language tag) wrapped around planner JSON
+_CODE_FENCE_RE = re.compile(r"^```[\w-]*\s*(.*?)\s*(?:```)?\s*$", re.DOTALL)
+
+# Instructions (normalized) for which the default plan is used without the planner LLM
+_DEFAULT_INSTRUCTIONS = frozenset({
+    "",
+    "evaluate loan conditions",
+    "evaluate the loan conditions",
+})
+
 DEFAULT_PLAN_STEPS: List[ReWOOPlanStep] = [
     {
         "id": "step_preconditions",
@@ -31,36 +101,43 @@ DEFAULT_PLAN_STEPS: List[ReWOOPlanStep] = [
 ]
 
 
+def _to_json(value: Any) -> str:
+    """Serialize prompt context with orjson (non-JSON types fall back to str)."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 def _build_default_plan(metadata: Dict[str, Any], s3_pdf_paths: List[str]) -> ReWOOPlan:
-    steps = []
-    for step in DEFAULT_PLAN_STEPS:
-        step_copy = dict(step)
-        step_input = dict(step_copy.get("input", {}))
-        if step_copy["tool"] == "call_preconditions_api":
-            step_input["metadata"] = metadata
-        elif step_copy["tool"] == "call_conditions_ai_api":
-            step_input["documents"] = s3_pdf_paths
-        step_copy["input"] = step_input
-        steps.append(step_copy)
+    # One shallow copy per step; per-request inputs are merged over the template
+    input_overrides = {
+        "call_preconditions_api": {"metadata": metadata},
+        "call_conditions_ai_api": {"documents": s3_pdf_paths},
+    }
+    steps = [
+        {**step, "input": {**step.get("input", {}), **input_overrides.get(step["tool"], {})}}
+        for step in DEFAULT_PLAN_STEPS
+    ]
     return {
         "summary": "Predict conditions using PreConditions then evaluate with Conditions AI.",
         "steps": steps,
     }
 
 
+def _content_part_text(item: Any) -> str:
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get("text") or ""
+    return str(item)
+
+
 def _stringify_llm_content(content: Any) -> str:
     if isinstance(content, str):
         return content
     if isinstance(content, list):
-        parts = []
-        for item in content:
-            if isinstance(item, str):
-                parts.append(item)
-            elif isinstance(item, dict):
-                parts.append(item.get("text") or "")
-            else:
-                parts.append(str(item))
-        return "".join(parts)
+        # Streamed chunks usually carry a single part; skip the join for those
+        if len(content) == 1:
+            return _content_part_text(content[0])
+        return "".join(_content_part_text(item) for item in content)
     return str(content)
 
 
@@ -69,15 +146,13 @@ def _parse_plan_from_llm(raw_text: str, metadata: Dict[str, Any], s3_pdf_paths:
         return None
 
     cleaned = raw_text.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`")
-        newline_idx = cleaned.find("\n")
-        if newline_idx != -1:
-            cleaned = cleaned[newline_idx + 1 :].strip()
+    fenced = _CODE_FENCE_RE.match(cleaned)
+    if fenced:
+        cleaned = fenced.group(1)
 
     try:
-        parsed = json.loads(cleaned)
-    except json.JSONDecodeError:
+        parsed = orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
         logger.warning("Planner LLM did not return JSON. Falling back to default plan.")
         return None
 
@@ -120,6 +195,27 @@ def _parse_plan_from_llm(raw_text: str, metadata: Dict[str, Any], s3_pdf_paths:
     }
 
 
+def _should_call_planner_llm(instructions: Optional[str]) -> bool:
+    """
+    Decide whether planning needs the LLM, per settings.rewoo_planner_mode.
+
+    "always" and "never" force the choice. "auto" skips the LLM when the
+    instructions are empty or one of the standard full-evaluation phrasings,
+    since the planner would only reproduce the default plan.
+    """
+    mode = settings.rewoo_planner_mode.lower()
+    if mode == "always":
+        return True
+    if mode == "never":
+        return False
+
+    normalized = (instructions or "").strip().rstrip(".").lower()
+    if normalized in _DEFAULT_INSTRUCTIONS:
+        logger.info("Standard instructions, using default plan without calling the planner LLM.")
+        return False
+    return True
+
+
 @trace_agent_execution(name="rewoo_planner")
 async def planner_node(state: ReWOOState) -> Dict[str, Any]:
     """Use an LLM planner to create a tool execution plan."""
@@ -130,61 +226,24 @@ async def planner_node(state: ReWOOState) -> Dict[str, Any]:
     plan: Optional[ReWOOPlan] = None
     reasoning: Optional[str] = None
 
-    if planner_llm:
-        prompt = (
-            "You are a smart loan evaluation agent. Analyze the user's instructions and choose the RIGHT tools.\n\n"
-            
-            "AVAILABLE TOOLS:\n"
-            "1. call_preconditions_api(metadata)\n"
-            "   - Use when: User asks to predict/identify deficient conditions or determine what's missing\n"
-            "   - Requires: Loan metadata (borrower info, loan program, documents)\n"
-            "   - Returns: List of predicted deficient conditions\n\n"
-            
-            "2. call_conditions_ai_api(conditions, documents)\n"
-            "   - Use when: User asks to evaluate if documents satisfy specific conditions\n"
-            "   - Requires: List of conditions to check + S3 document paths\n"
-            "   - Returns: Fulfillment status for each condition\n"
-            "   - Note: Can use output from call_preconditions_api or accept conditions directly\n\n"
-            
-            "3. retrieve_s3_document(s3_path)\n"
-            "   - Use when: User asks to check S3 access or retrieve document metadata\n"
-            "   - Requires: S3 path (s3://bucket/key)\n"
-            "   - Returns: Document metadata and access status\n\n"
-            
-            "4. query_database(query)\n"
-            "   - Use when: User asks for historical data or past evaluations\n"
-            "   - Returns: Historical loan evaluation data\n\n"
-            
-            "INSTRUCTIONS FROM USER:\n"
-            f"{instructions}\n\n"
-            
-            "AVAILABLE DATA:\n"
-            f"- Metadata: {json.dumps(metadata, default=str)}\n"
-            f"- Documents: {json.dumps(s3_pdf_paths, default=str)}\n\n"
-            
-            "DECISION RULES:\n"
-            "- If user asks ONLY about deficiencies → call_preconditions_api only\n"
-            "- If user asks ONLY about document validation → call_conditions_ai_api only\n"
-            "- If user asks for FULL evaluation → call_preconditions_api THEN call_conditions_ai_api\n"
-            "- If user asks about S3 access → retrieve_s3_document only\n"
-            "- Always choose the MINIMUM tools needed to answer the user's question\n\n"
-            
-            "Respond with JSON object containing:\n"
-            "{\n"
-            "  \"summary\": \"Brief explanation of your plan\",\n"
-            "  \"steps\": [\n"
-            "    {\n"
-            "      \"id\": \"step_1\",\n"
-            "      \"tool\": \"tool_name\",\n"
-            "      \"description\": \"What this step does\",\n"
-            "      \"input\": {}\n"
-            "    }\n"
-            "  ]\n"
-            "}\n\n"
-            "JSON only, no other text:"
-        )
+    if planner_llm and _should_call_planner_llm(state.get("instructions")):
+        # Static instructions go first as the system message so the provider can
+        # reuse the cached prefix; only the per-request data varies
+        messages = [
+            SystemMessage(content=_PLANNER_SYSTEM_PROMPT),
+            HumanMessage(content=(
+                "INSTRUCTIONS FROM USER:\n"
+                f"{instructions}\n\n"
+                
+                "AVAILABLE DATA:\n"
+                f"- Metadata: {_to_json(metadata)}\n"
+                f"- Documents: {_to_json(s3_pdf_paths)}\n\n"
+                
+                "JSON only, no other text:"
+            )),
+        ]
         try:
-            response = await planner_llm.ainvoke(prompt)
+            response = await planner_llm.ainvoke(messages)
             raw_text = _stringify_llm_content(response.content)
             plan = _parse_plan_from_llm(raw_text, metadata, s3_pdf_paths)
             reasoning = raw_text
@@ -205,86 +264,175 @@ async def planner_node(state: ReWOOState) -> Dict[str, Any]:
     }
 
 
+def _resolve_from_step(from_step: Any, step_ids: List[str]) -> Optional[str]:
+    """Map a `from_step` reference ("step_x", "x" or an int) to one of `step_ids`."""
+    if isinstance(from_step, int):
+        from_step = str(from_step)
+    if not from_step:
+        return None
+    if from_step in step_ids:
+        return from_step
+    if f"step_{from_step}" in step_ids:
+        return f"step_{from_step}"
+    return None
+
+
+def _plan_levels(steps: List[ReWOOPlanStep]) -> List[List[int]]:
+    """
+    Group plan steps (by index) into levels that can run concurrently.
+
+    Only call_conditions_ai_api consumes another step's output: it depends on
+    its `from_step` if that names an earlier step, otherwise on every earlier
+    step (it falls back to the latest evidence). Steps that already carry
+    their input, and all other tools, have no dependencies.
+    """
+    levels: List[List[int]] = []
+    step_levels: List[int] = []
+    latest_index: Dict[str, int] = {}
+
+    for index, step in enumerate(steps):
+        payload = step.get("input") or {}
+        depends_on: List[int] = []
+        if step.get("tool") == "call_conditions_ai_api" and not (
+            payload.get("transformed_input")
+            or isinstance(payload.get("preconditions_output"), dict)
+        ):
+            source = _resolve_from_step(payload.get("from_step"), list(latest_index))
+            depends_on = [latest_index[source]] if source else list(range(index))
+
+        level = 1 + max((step_levels[dep] for dep in depends_on), default=-1)
+        step_levels.append(level)
+        if level == len(levels):
+            levels.append([])
+        levels[level].append(index)
+        latest_index[step.get("id", "step")] = index
+
+    return levels
+
+
+async def _execute_step(
+    step: ReWOOPlanStep,
+    state: ReWOOState,
+    evidence: Dict[str, Any],
+    visible_keys: List[str],
+) -> Dict[str, Any]:
+    """
+    Run a single plan step and return the tool result.
+
+    `visible_keys` lists, in order, the evidence entries this step may read:
+    anything present before the worker started plus earlier plan steps.
+    """
+    metadata = state.get("metadata", {})
+    tool_name = step.get("tool")
+    step_input = step.get("input") or {}
+
+    if tool_name == "call_preconditions_api":
+        return await conditions_agent_tools.call_preconditions_api({"metadata": metadata, **step_input})
+    if tool_name == "call_conditions_ai_api":
+        payload = {
+            **step_input,
+            # An empty (or missing) document list falls back to the run's PDFs;
+            # Conditions AI cannot evaluate without at least one document
+            "documents": step_input.get("documents") or state.get("s3_pdf_paths", []),
+            "output_destination": step_input.get("output_destination", state.get("output_destination")),
+        }
+
+        # Resolve preconditions_output from evidence unless the plan supplied it
+        # (string placeholders such as "{{step_preconditions}}" also need resolving)
+        if isinstance(step_input.get("preconditions_output", ""), str):
+            available = [key for key in visible_keys if key in evidence]
+            source = _resolve_from_step(step_input.get("from_step"), available) or (
+                available[-1] if available else None
+            )
+            if source:
+                payload["preconditions_output"] = evidence[source]
+            else:
+                payload.pop("preconditions_output", None)
+                # If still no preconditions_output, use metadata if available
+                if metadata and metadata.get("conditions"):
+                    logger.info("No preconditions_output found, using metadata for validation-only scenario")
+                    payload["metadata"] = metadata
+
+        return await conditions_agent_tools.call_conditions_ai_api(payload)
+    if tool_name == "retrieve_s3_document":
+        return await conditions_agent_tools.retrieve_s3_document(step_input)
+    if tool_name == "query_database":
+        return await conditions_agent_tools.query_database(step_input)
+    return {
+        "status": "skipped",
+        "reason": f"Unknown tool '{tool_name}'.",
+    }
+
+
 @trace_agent_execution(name="rewoo_worker")
 async def worker_node(state: ReWOOState) -> Dict[str, Any]:
-    """Execute the previously planned steps sequentially."""
+    """Execute the planned steps, running steps without data dependencies concurrently."""
     metadata = state.get("metadata", {})
     s3_pdf_paths = state.get("s3_pdf_paths", [])
 
     plan = state.get("plan") or _build_default_plan(metadata, s3_pdf_paths)
     steps = plan.get("steps", [])
 
-    tools = ConditionsAgentTools(default_documents=s3_pdf_paths)
     evidence: Dict[str, Any] = state.get("evidence", {})
     evidence_log: List[ReWOOEvidence] = state.get("evidence_log", [])
+    step_ids = [step.get("id", "step") for step in steps]
+    initial_keys = list(evidence)
 
-    for step in steps:
-        step_id = step.get("id", "step")
-        tool_name = step.get("tool")
-        payload = dict(step.get("input") or {})
-
-        logger.info("Executing ReWOO step %s using tool %s", step_id, tool_name)
+    for level in _plan_levels(steps):
+        for index in level:
+            logger.info("Executing ReWOO step %s using tool %s", step_ids[index], steps[index].get("tool"))
 
+        tasks = [
+            asyncio.create_task(_execute_step(steps[index], state, evidence, initial_keys + step_ids[:index]))
+            for index in level
+        ]
         try:
-            if tool_name == "call_preconditions_api":
-                payload.setdefault("metadata", metadata)
-                result = await tools.call_preconditions_api(payload)
-            elif tool_name == "call_conditions_ai_api":
-                # Check if we have preconditions_output to use
-                existing_output = payload.get("preconditions_output")
-                if isinstance(existing_output, str):
-                    payload.pop("preconditions_output")
-                
-                # Try to get preconditions_output from evidence if not provided
-                if "preconditions_output" not in payload:
-                    from_step = payload.get("from_step")
-                    if isinstance(from_step, int):
-                        from_step = str(from_step)
-                    if from_step and from_step in evidence:
-                        payload["preconditions_output"] = evidence[from_step]
-                    elif from_step and f"step_{from_step}" in evidence:
-                        payload["preconditions_output"] = evidence[f"step_{from_step}"]
-                    elif evidence:
-                        latest_key = list(evidence.keys())[-1]
-                        payload["preconditions_output"] = evidence[latest_key]
-                    # If still no preconditions_output, use metadata if available
-                    elif metadata and metadata.get("conditions"):
-                        logger.info("No preconditions_output found, using metadata for validation-only scenario")
-                        payload["metadata"] = metadata
-                        payload.pop("preconditions_output", None)  # Remove empty preconditions_output
-                
-                payload.setdefault("documents", s3_pdf_paths)
-                payload.setdefault("output_destination", state.get("output_destination"))
-                result = await tools.call_conditions_ai_api(payload)
-            elif tool_name == "retrieve_s3_document":
-                result = await tools.retrieve_s3_document(payload)
-            elif tool_name == "query_database":
-                result = await tools.query_database(payload)
+            _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            # A failed step fails the run, so stop its siblings instead of waiting on them
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+        # Merge results in plan order within the level; steps in a level finish together
+        completed_at = datetime.utcnow().isoformat()
+        error: Optional[BaseException] = None
+        for index, task in zip(level, tasks):
+            step_id = step_ids[index]
+            tool_name = steps[index].get("tool")
+
+            if task.cancelled():
+                logger.info("Cancelled ReWOO step %s after a concurrent step failed", step_id)
+                result = {"status": "cancelled", "reason": "A concurrent step failed."}
+            elif task.exception() is not None:
+                if error is None:
+                    error = task.exception()
+                    logger.error("Error executing tool %s: %s", tool_name, error, exc_info=error)
+                continue
             else:
-                result = {
-                    "status": "skipped",
-                    "reason": f"Unknown tool '{tool_name}'.",
+                result = task.result()
+                evidence[step_id] = result
+
+            evidence_log.append(
+                {
+                    "step_id": step_id,
+                    "tool": tool_name or "unknown",
+                    "output": result,
+                    "completed_at": completed_at,
                 }
-        except Exception as exc:
-            logger.error("Error executing tool %s: %s", tool_name, exc, exc_info=True)
+            )
+
+        if error is not None:
             return {
                 "evidence": evidence,
                 "evidence_log": evidence_log,
-                "error": str(exc),
+                "error": str(error),
                 "status": "failed",
                 "stage": "failed",
             }
 
-        evidence[step_id] = result
-        evidence_log.append(
-            {
-                "step_id": step_id,
-                "tool": tool_name or "unknown",
-                "output": result,
-                "completed_at": datetime.utcnow().isoformat(),
-            }
-        )
-
     return {
         "evidence": evidence,
         "evidence_log": evidence_log,
@@ -293,23 +441,75 @@ async def worker_node(state: ReWOOState) -> Dict[str, Any]:
     }
 
 
-def _build_solver_prompt(state: ReWOOState) -> str:
+def _compact_tool_output(output: Any) -> Any:
+    """Keep only the fields the solver summarises from known tool outputs."""
+    if not isinstance(output, dict):
+        return output
+
+    if "processed_conditions" in output:
+        # Conditions AI: drop model thinking, usage and per-call analysis metadata, but keep
+        # the run status and message (e.g. why completed_no_relevant_documents has no conditions)
+        return {
+            **{key: output[key] for key in ("processing_status", "message") if key in output},
+            "processed_conditions": [
+                {
+                    "condition_id": cond.get("condition_id"),
+                    "title": cond.get("title"),
+                    "document_status": cond.get("document_status"),
+                    "confidence": (cond.get("analysis_metadata") or {}).get("result_confidence"),
+                    "document_analysis": cond.get("document_analysis"),
+                }
+                for cond in output.get("processed_conditions") or []
+            ]
+        }
+
+    if "deficient_conditions" in output or "final_results" in output:
+        # PreConditions: drop the intermediate requirement lists, which can run to megabytes
+        final_results = output.get("final_results") or {}
+        deficiencies = final_results.get("top_n") or output.get("deficient_conditions") or []
+        return {
+            "compartments": output.get("compartments", []),
+            "deficient_conditions": [
+                {
+                    "condition_id": item.get("condition_id"),
+                    "status": item.get("status"),
+                    "actionable_instruction": item.get("actionable_instruction"),
+                    "priority_score": item.get("priority_score"),
+                }
+                for item in deficiencies
+            ],
+            "summary": final_results.get("summary"),
+        }
+
+    return output
+
+
+def _build_solver_messages(state: ReWOOState) -> List[BaseMessage]:
     metadata = state.get("metadata", {})
     instructions = state.get("instructions") or "Evaluate the loan conditions."
     plan = state.get("plan", {})
     evidence = state.get("evidence", {})
-
-    return (
-        "You are the solver for a loan-conditions evaluation agent. Using the plan and evidence, "
-        "summarise the outcome of the evaluation. Provide:\n"
-        "1. A concise summary.\n"
-        "2. Key findings (fulfilled vs not fulfilled conditions).\n"
-        "3. Any missing information or follow-up actions.\n\n"
-        f"Metadata: {json.dumps(metadata, default=str)}\n"
-        f"Instructions: {instructions}\n"
-        f"Plan: {json.dumps(plan, default=str)}\n"
-        f"Evidence: {json.dumps(evidence, default=str)}\n"
-    )
+    if settings.rewoo_compact_evidence:
+        evidence = {step_id: _compact_tool_output(output) for step_id, output in evidence.items()}
+
+    return [
+        SystemMessage(content=_SOLVER_SYSTEM_PROMPT),
+        # Most stable context first so the cached prompt prefix extends past the system message
+        HumanMessage(content=(
+            f"Instructions: {instructions}\n"
+            f"Metadata: {_to_json(metadata)}\n"
+            f"Plan: {_to_json(plan)}\n"
+            f"Evidence: {_to_json(evidence)}\n"
+        )),
+    ]
+
+
+def _solver_stream_writer() -> Callable[[Any], None]:
+    """Return the LangGraph stream writer, or a no-op outside a graph run (e.g. when called directly)."""
+    try:
+        return get_stream_writer()
+    except RuntimeError:
+        return lambda _event: None
 
 
 @trace_agent_execution(name="rewoo_solver")
@@ -321,23 +521,38 @@ async def solver_node(state: ReWOOState) -> Dict[str, Any]:
     solver_summary: Optional[str] = None
 
     if solver_llm:
-        prompt = _build_solver_prompt(state)
+        messages = _build_solver_messages(state)
+        write = _solver_stream_writer()
+        chunks: List[str] = []
         try:
-            response = await solver_llm.ainvoke(prompt)
-            solver_summary = _stringify_llm_content(response.content).strip()
+            async for chunk in solver_llm.astream(messages):
+                text = _stringify_llm_content(chunk.content)
+                if text:
+                    chunks.append(text)
+                    write({"node": "solver", "stage": "solver_streaming", "delta": text})
+            solver_summary = "".join(chunks).strip()
         except Exception as exc:  # pragma: no cover - defensive
             logger.warning("Solver LLM failed: %s", exc)
+            if chunks:
+                # Clients discard the partial tokens; the fallback summary follows in solver_complete
+                write({
+                    "node": "solver",
+                    "stage": "solver_reset",
+                    "error": "Solver stream failed; partial output discarded.",
+                })
 
     if not solver_summary:
         solver_summary = "Conditions evaluation completed using collected evidence."
 
-    conditions_ai_result: Optional[Dict[str, Any]] = None
-    for step in plan.get("steps", []):
-        if step.get("tool") == "call_conditions_ai_api":
-            step_id = step.get("id")
-            if step_id and step_id in evidence:
-                conditions_ai_result = evidence[step_id]
-                break
+    conditions_ai_step_id = next(
+        (
+            step["id"]
+            for step in plan.get("steps", [])
+            if step.get("tool") == "call_conditions_ai_api" and step.get("id") in evidence
+        ),
+        None,
+    )
+    conditions_ai_result = evidence[conditions_ai_step_id] if conditions_ai_step_id else None
 
     fulfilled: List[Dict[str, Any]] = []
     not_fulfilled: List[Dict[str, Any]] = []
@@ -364,6 +579,23 @@ async def solver_node(state: ReWOOState) -> Dict[str, Any]:
     }
 
 
+def _latency_ms(started_at_ns: Optional[int], started_at: Any, completed_at: datetime) -> Optional[int]:
+    """
+    Run latency in ms: monotonic when the run was started in-process, else
+    wall clock from started_at (LangGraph Cloud/Studio inputs), else None.
+    """
+    if started_at_ns is not None:
+        return (time.monotonic_ns() - started_at_ns) // 1_000_000
+    if isinstance(started_at, str):
+        try:
+            started_at = datetime.fromisoformat(started_at)
+        except ValueError:
+            return None
+    if isinstance(started_at, datetime):
+        return int((completed_at - started_at).total_seconds() * 1000)
+    return None
+
+
 @trace_agent_execution(name="rewoo_store_results")
 async def store_results_node(state: ReWOOState) -> Dict[str, Any]:
     """Prepare final response payload."""
@@ -371,12 +603,14 @@ async def store_results_node(state: ReWOOState) -> Dict[str, Any]:
     plan = state.get("plan", {})
     evidence = state.get("evidence", {})
 
-    execution_metadata = state.get("execution_metadata", {})
-    started_at = execution_metadata.get("started_at") or datetime.utcnow()
+    execution_metadata = dict(state.get("execution_metadata", {}))
+    # Monotonic start is process-internal: use it for latency, keep it out of the response
+    started_at_ns = execution_metadata.pop("started_at_ns", None)
     completed_at = datetime.utcnow()
-    execution_metadata = dict(execution_metadata)
     execution_metadata["completed_at"] = completed_at
-    execution_metadata["latency_ms"] = int((completed_at - started_at).total_seconds() * 1000)
+    execution_metadata["latency_ms"] = _latency_ms(
+        started_at_ns, execution_metadata.get("started_at"), completed_at
+    )
 
     final_results = {
         "execution_id": execution_metadata.get("execution_id"),
@@ -415,6 +649,7 @@ def initialise_rewoo_state(
         "execution_metadata": {
             "execution_id": execution_id,
             "started_at": datetime.utcnow(),
+            "started_at_ns": time.monotonic_ns(),
             "total_tokens": 0,
             "cost_usd": 0.0,
             "latency_ms": 0,
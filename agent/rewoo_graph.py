@@ -1,6 +1,7 @@
 """LangGraph assembly for the ReWOO Conditions Agent."""
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import Any, AsyncIterator, Dict, List, Optional
 
 from langgraph.graph import StateGraph, END
@@ -14,12 +15,17 @@ from agent.rewoo_agent import (
 )
 from agent.rewoo_state import ReWOOState
 from utils.logging_config import get_logger
+from utils.streaming import buffered
 
 logger = get_logger(__name__)
 
+# Max graph events read ahead of the streaming consumer
+STREAM_BUFFER_SIZE = 4
 
+
+@lru_cache(maxsize=1)
 def create_rewoo_agent_graph() -> StateGraph[ReWOOState]:
-    """Create and compile the ReWOO state graph."""
+    """Create and compile the ReWOO state graph (compiled once and reused)."""
     workflow = StateGraph(ReWOOState)
 
     workflow.add_node("planner", planner_node)
@@ -57,13 +63,29 @@ async def run_rewoo_agent(
     return final_state
 
 
+def _state_delta(node_state: Dict[str, Any], streamed: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a node update to the top-level keys the client has not already received.
+
+    Keys whose value matches the last streamed value are dropped; changed
+    values are sent whole. `streamed` is updated in place afterwards.
+    """
+    delta = {
+        key: value
+        for key, value in node_state.items()
+        if not (key in streamed and streamed[key] == value)
+    }
+    streamed.update(node_state)
+    return delta
+
+
 async def run_rewoo_agent_streaming(
     metadata: Dict[str, Any],
     s3_pdf_paths: List[str],
     instructions: Optional[str] = None,
     output_destination: Optional[str] = None,
 ) -> AsyncIterator[Dict[str, Any]]:
-    """Run the ReWOO agent and stream intermediate events."""
+    """Run the ReWOO agent and stream intermediate events (state as per-node deltas)."""
     initial_state = initialise_rewoo_state(
         metadata=metadata,
         s3_pdf_paths=s3_pdf_paths,
@@ -71,8 +93,17 @@ async def run_rewoo_agent_streaming(
         output_destination=output_destination,
     )
     workflow = create_rewoo_agent_graph()
+    streamed: Dict[str, Any] = {}
+
+    # Read ahead into a bounded buffer so the graph keeps running while the
+    # caller writes the previous event, without queueing unboundedly
+    events = workflow.astream(initial_state, stream_mode=["updates", "custom"])
+    async for mode, event in buffered(events, STREAM_BUFFER_SIZE):
+        if mode == "custom":
+            # Incremental solver tokens emitted via the node's stream writer
+            yield {**event, "status": "running"}
+            continue
 
-    async for event in workflow.astream(initial_state):
         node_name = next(iter(event))
         node_state: Dict[str, Any] = event[node_name]
         stage = node_state.get("stage", "")
@@ -84,7 +115,7 @@ async def run_rewoo_agent_streaming(
             "stage": stage,
             "status": node_state.get("status"),
             "timestamp": node_state.get("execution_metadata", {}).get("completed_at"),
-            "state": node_state,
+            "state": _state_delta(node_state, streamed),
         }
 
 
@@ -1,13 +1,21 @@
 """State schema for Conditions Agent LangGraph."""
-from typing import TypedDict, List, Dict, Any, Optional
+import operator
+from typing import Annotated, TypedDict, List, Dict, Any, Optional
 from datetime import datetime
 
 
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer that merges a node's partial dict update into the existing value."""
+    return {**(left or {}), **(right or {})}
+
+
 class ExecutionMetadata(TypedDict, total=False):
     """Metadata about the execution."""
     trace_id: Optional[str]
     execution_id: Optional[str]
+    cached_from_execution_id: Optional[str]  # Set when the result was served from the result cache
     started_at: datetime
+    started_at_ns: int  # time.monotonic_ns() at start, for latency math
     completed_at: Optional[datetime]
     total_tokens: int
     cost_usd: float
@@ -36,6 +44,7 @@ class AgentState(TypedDict, total=False):
     
     # ========== Node Outputs (streamed after each node) ==========
     preconditions_output: Optional[Dict[str, Any]]  # Output from PreConditions API
+    pdf_metadata: Optional[Dict[str, Any]]  # S3 HeadObject metadata for the uploaded PDF
     transformed_input: Optional[Dict[str, Any]]  # Transformed input for Conditions AI
     conditions_ai_output: Optional[Dict[str, Any]]  # Complete output from Conditions AI (S3)
     
@@ -47,8 +56,8 @@ class AgentState(TypedDict, total=False):
     final_results: Optional[Dict[str, Any]]  # Consolidated results for frontend
     
     # ========== Execution Tracking ==========
-    execution_metadata: ExecutionMetadata
-    node_outputs: List[NodeOutput]  # Track each node completion for streaming
+    execution_metadata: Annotated[ExecutionMetadata, merge_dicts]  # Nodes return only the keys they set
+    node_outputs: Annotated[List[NodeOutput], operator.add]  # Appended by each node (return only the new entry)
     
     # ========== Decision Flags ==========
     requires_human_review: bool
@@ -56,4 +65,4 @@ class AgentState(TypedDict, total=False):
     
     # ========== Error Handling ==========
     error: Optional[str]
-    status: str  # 'running', 'completed', 'failed', 'needs_review'
+    status: str  # 'running', 'completed', 'completed_no_relevant_documents', 'failed', 'needs_review'
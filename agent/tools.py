@@ -34,7 +34,8 @@ class ConditionsAgentTools:
         # Option 1: Already transformed input
         transformed_input = payload.get("transformed_input")
         if transformed_input:
-            return await conditions_ai_client.evaluate(transformed_input)
+            # Caller-built input carries its own output_destination; never join another run
+            return await conditions_ai_client.evaluate(transformed_input, share_inflight=False)
 
         # Option 2: Transform from preconditions output
         preconditions_output = payload.get("preconditions_output")
@@ -63,7 +64,9 @@ class ConditionsAgentTools:
                 s3_pdf_paths=documents,
                 output_destination=output_destination
             )
-            return await conditions_ai_client.evaluate(transformed)
+            return await conditions_ai_client.evaluate(
+                transformed, share_inflight=output_destination is None
+            )
 
         # No valid input provided
         raise ValueError(
@@ -95,3 +98,5 @@ class ConditionsAgentTools:
         }
 
 
+# Stateless wrapper over the module-level service clients; shared across requests
+conditions_agent_tools = ConditionsAgentTools()
@@ -1,17 +1,27 @@
 """FastAPI endpoints for Conditions Agent."""
-import json
+import asyncio
+from contextlib import asynccontextmanager
 from typing import List, Optional, Dict, Any
+import orjson
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from agent.graph import run_conditions_agent, run_conditions_agent_streaming
+from agent.graph import (
+    create_conditions_agent_graph,
+    run_conditions_agent,
+    run_conditions_agent_streaming
+)
 from agent.rewoo_graph import run_rewoo_agent, run_rewoo_agent_streaming
-from database.repository import db_repository
+from config.llm import llm_http_client
+from database.repository import dispose_repository, get_repository
 from services.conditions_ai import conditions_ai_client
+from services.preconditions import preconditions_client
 from utils.logging_config import setup_logging, get_logger
+from utils.streaming import coalesced
 from utils.tracing import tracing_manager
 from config.settings import settings
 
@@ -19,11 +29,48 @@ from config.settings import settings
 setup_logging()
 logger = get_logger(__name__)
 
+# Background feedback writes: attempts and base backoff (doubled per retry)
+FEEDBACK_WRITE_ATTEMPTS = 3
+FEEDBACK_RETRY_BACKOFF_SECONDS = 0.5
+
+
+async def _warm_up_clients():
+    """Prime downstream connection pools so the first request skips TLS handshakes."""
+    await asyncio.gather(
+        preconditions_client.warm_up(),
+        conditions_ai_client.warm_up()
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown.
+    
+    Compiles the conditions graph once instead of on the first request,
+    warms up downstream clients in the background without blocking startup,
+    and closes pooled downstream connections on shutdown.
+    """
+    create_conditions_agent_graph()
+    warm_up_task = asyncio.create_task(_warm_up_clients())
+    try:
+        yield
+    finally:
+        if not warm_up_task.done():
+            warm_up_task.cancel()
+        await conditions_ai_client.close()
+        await preconditions_client.close()
+        await llm_http_client.aclose()
+        await dispose_repository()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Conditions Agent API",
     description="LangGraph-based orchestrator for loan conditions evaluation",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -35,6 +82,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (evidence, reasoning); Starlette leaves
+# text/event-stream uncompressed so SSE frames are never held back
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+def _sse_event(event: Dict[str, Any]) -> bytes:
+    """Format an event as an SSE data frame (orjson handles datetimes natively)."""
+    # Bytes pass through StreamingResponse without a decode/encode round trip
+    return b"data: " + orjson.dumps(event, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n\n"
+
 
 # Request/Response Models
 
@@ -84,7 +141,7 @@ class EvaluateConditionsResponse(BaseModel):
 
 class RMFeedbackRequest(BaseModel):
     """Request to submit RM feedback."""
-    evaluation_id: str
+    evaluation_id: UUID
     rm_user_id: str
     feedback_type: str = Field(..., description="approve, reject, or correct")
     corrected_result: Optional[str] = None
@@ -100,12 +157,6 @@ class HealthResponse(BaseModel):
     airflow_dag_status: Optional[str] = None
 
 
-class ReWOOAgentResponse(BaseModel):
-    """Response returned by the ReWOO agent."""
-    final_results: Dict[str, Any]
-    execution_metadata: Dict[str, Any]
-
-
 # Endpoints
 
 @app.get("/health", response_model=HealthResponse)
@@ -169,8 +220,7 @@ async def evaluate_loan_conditions_streaming(request: EvaluateLoanRequest):
                 s3_pdf_path=request.s3_pdf_path
             ):
                 # Format as SSE
-                event_data = json.dumps(event, default=str)
-                yield f"data: {event_data}\n\n"
+                yield _sse_event(event)
                 
         except Exception as e:
             logger.error(f"Error in streaming: {e}", exc_info=True)
@@ -180,10 +230,10 @@ async def evaluate_loan_conditions_streaming(request: EvaluateLoanRequest):
                 "status": "failed",
                 "error": str(e)
             }
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield _sse_event(error_event)
     
     return StreamingResponse(
-        event_generator(),
+        coalesced(event_generator()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -193,6 +243,28 @@ async def evaluate_loan_conditions_streaming(request: EvaluateLoanRequest):
     )
 
 
+@app.post("/api/v1/evaluate-loan-conditions/run", response_class=ORJSONResponse, summary="Conditions Agent (non-streaming)")
+async def evaluate_loan_conditions_run(request: EvaluateLoanRequest):
+    """
+    Evaluate loan conditions and return the final results in one response.
+    
+    Repeat requests for the same input and unchanged PDF are served from the
+    in-process result cache (execution_metadata.cached_from_execution_id is set).
+    """
+    final_state = await run_conditions_agent(
+        preconditions_input=request.preconditions_input,
+        s3_pdf_path=request.s3_pdf_path
+    )
+    
+    if final_state.get("status") == "failed":
+        raise HTTPException(status_code=500, detail=final_state.get("error", "Agent failed to complete."))
+    
+    return ORJSONResponse({
+        "final_results": final_state.get("final_results", {}),
+        "execution_metadata": final_state.get("execution_metadata", {}),
+    })
+
+
 @app.post("/api/v1/evaluate-conditions", summary="ReWOO agent (streaming)")
 async def evaluate_conditions_streaming(request: ReWOOAgentRequest):
     """Streaming endpoint for the ReWOO agent."""
@@ -206,14 +278,14 @@ async def evaluate_conditions_streaming(request: ReWOOAgentRequest):
                 instructions=request.instructions,
                 output_destination=request.output_destination,
             ):
-                yield f"data: {json.dumps(event, default=str)}\n\n"
+                yield _sse_event(event)
         except Exception as exc:  # pragma: no cover - defensive
             logger.error("ReWOO streaming error: %s", exc, exc_info=True)
             error_event = {"node": "error", "stage": "failed", "error": str(exc)}
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield _sse_event(error_event)
 
     return StreamingResponse(
-        event_generator(),
+        coalesced(event_generator()),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -223,7 +295,7 @@ async def evaluate_conditions_streaming(request: ReWOOAgentRequest):
     )
 
 
-@app.post("/api/v1/evaluate-conditions/run", response_model=ReWOOAgentResponse, summary="ReWOO agent (non-streaming)")
+@app.post("/api/v1/evaluate-conditions/run", response_class=ORJSONResponse, summary="ReWOO agent (non-streaming)")
 async def evaluate_conditions_run(request: ReWOOAgentRequest):
     """Run the ReWOO agent and return the final results."""
     final_state = await run_rewoo_agent(
@@ -236,10 +308,12 @@ async def evaluate_conditions_run(request: ReWOOAgentRequest):
     if final_state.get("status") != "completed":
         raise HTTPException(status_code=500, detail=final_state.get("error", "Agent failed to complete."))
 
-    return ReWOOAgentResponse(
-        final_results=final_state.get("final_results", {}),
-        execution_metadata=final_state.get("execution_metadata", {}),
-    )
+    # Agent output is already well-formed; returning a response directly skips
+    # re-validating (and copying) the evidence through a response model
+    return ORJSONResponse({
+        "final_results": final_state.get("final_results", {}),
+        "execution_metadata": final_state.get("execution_metadata", {}),
+    })
 
 
 @app.post("/api/v1/evaluate-conditions/legacy", response_model=EvaluateConditionsResponse)
@@ -251,8 +325,34 @@ async def evaluate_conditions_legacy(_: EvaluateConditionsRequest):
     )
 
 
+async def _persist_feedback(feedback_id: UUID, request: RMFeedbackRequest):
+    """Write RM feedback after the response has been sent, retrying transient failures."""
+    for attempt in range(1, FEEDBACK_WRITE_ATTEMPTS + 1):
+        try:
+            await get_repository().create_feedback(
+                feedback_id=feedback_id,
+                evaluation_id=request.evaluation_id,
+                rm_user_id=request.rm_user_id,
+                feedback_type=request.feedback_type,
+                corrected_result=request.corrected_result,
+                notes=request.notes
+            )
+            return
+        except Exception as e:
+            if attempt < FEEDBACK_WRITE_ATTEMPTS:
+                logger.warning(f"Storing feedback {feedback_id} failed (attempt {attempt}): {e}")
+                await asyncio.sleep(FEEDBACK_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            else:
+                # Dead letter: the full payload is logged so the audit record can be replayed
+                logger.error(
+                    f"Dropping feedback {feedback_id} after {attempt} attempts: {e}; "
+                    f"payload: {request.model_dump_json()}",
+                    exc_info=True
+                )
+
+
 @app.post("/api/v1/feedback")
-async def submit_feedback(request: RMFeedbackRequest):
+async def submit_feedback(request: RMFeedbackRequest, background_tasks: BackgroundTasks):
     """
     Submit Relationship Manager feedback on an evaluation.
     
@@ -260,58 +360,53 @@ async def submit_feedback(request: RMFeedbackRequest):
     - Audit trail
     - Continuous improvement
     - Training data collection
+    
+    The evaluation is checked up front (404 if unknown); the feedback ID is
+    assigned then and the write happens after the response is sent, so the
+    RM UI gets its acknowledgement without waiting on the insert.
     """
     logger.info(f"Received feedback from {request.rm_user_id} for evaluation {request.evaluation_id}")
     
-    try:
-        # Store feedback
-        feedback = db_repository.create_feedback(
-            evaluation_id=UUID(request.evaluation_id),
-            rm_user_id=request.rm_user_id,
-            feedback_type=request.feedback_type,
-            corrected_result=request.corrected_result,
-            notes=request.notes
-        )
-        
-        return {
-            "feedback_id": str(feedback.feedback_id),
-            "status": "success",
-            "message": "Feedback recorded successfully"
-        }
-        
-    except Exception as e:
-        logger.error(f"Error submitting feedback: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+    if not await get_repository().evaluation_exists(request.evaluation_id):
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    
+    feedback_id = uuid4()
+    background_tasks.add_task(_persist_feedback, feedback_id, request)
+    
+    return {
+        "feedback_id": str(feedback_id),
+        "status": "queued",
+        "message": "Feedback queued for recording"
+    }
 
 
 @app.get("/api/v1/executions/{execution_id}")
-async def get_execution(execution_id: str):
+async def get_execution(execution_id: UUID):
     """Get execution details by ID."""
     try:
-        execution = db_repository.get_execution(UUID(execution_id))
+        execution = await get_repository().get_execution(execution_id)
         
         if not execution:
             raise HTTPException(status_code=404, detail="Execution not found")
         
-        # Get evaluations
-        evaluations = db_repository.get_evaluations_by_execution(UUID(execution_id))
+        evaluations = await get_repository().get_evaluations_by_execution(execution_id)
         
-        return {
-            "execution_id": str(execution.execution_id),
+        # Returned as a response so FastAPI skips jsonable_encoder; orjson
+        # encodes the UUIDs and datetimes natively
+        return ORJSONResponse({
+            "execution_id": execution.execution_id,
             "loan_guid": execution.loan_guid,
             "status": execution.status,
-            "started_at": execution.started_at.isoformat(),
-            "completed_at": execution.completed_at.isoformat() if execution.completed_at else None,
+            "started_at": execution.started_at,
+            "completed_at": execution.completed_at,
             "total_tokens": execution.total_tokens,
             "cost_usd": float(execution.cost_usd),
             "latency_ms": execution.latency_ms,
             "trace_id": execution.trace_id,
             "evaluations_count": len(evaluations),
             "error_message": execution.error_message
-        }
+        })
         
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid execution ID format")
     except Exception as e:
         logger.error(f"Error retrieving execution: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -321,21 +416,21 @@ async def get_execution(execution_id: str):
 async def get_loan_state(loan_guid: str):
     """Get current state of a loan."""
     try:
-        loan_state = db_repository.get_loan_state(loan_guid)
+        loan_state = await get_repository().get_loan_state(loan_guid)
         
         if not loan_state:
             raise HTTPException(status_code=404, detail="Loan state not found")
         
-        return {
+        return ORJSONResponse({
             "loan_guid": loan_state.loan_guid,
             "current_status": loan_state.current_status,
-            "last_execution_id": str(loan_state.last_execution_id) if loan_state.last_execution_id else None,
+            "last_execution_id": loan_state.last_execution_id,
             "conditions_count": loan_state.conditions_count,
             "satisfied_count": loan_state.satisfied_count,
             "unsatisfied_count": loan_state.unsatisfied_count,
             "uncertain_count": loan_state.uncertain_count,
-            "updated_at": loan_state.updated_at.isoformat()
-        }
+            "updated_at": loan_state.updated_at
+        })
         
     except Exception as e:
         logger.error(f"Error retrieving loan state: {e}", exc_info=True)
@@ -344,10 +439,12 @@ async def get_loan_state(loan_guid: str):
 
 if __name__ == "__main__":
     import uvicorn
+    # Workers need the import string: each worker process imports its own app
     uvicorn.run(
-        app,
+        "api.main:app",
         host=settings.api_host,
         port=settings.api_port,
+        workers=settings.api_workers,
         log_level=settings.log_level.lower()
     )
 
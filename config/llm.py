@@ -1,21 +1,32 @@
 """Centralised LLM configuration used by the ReWOO agent."""
 from __future__ import annotations
 
+import httpx
 from langchain_openai import ChatOpenAI
 
 from config.settings import settings
 
+# One connection pool for both models, so planner and solver calls reuse
+# the same keep-alive connections to the OpenAI API
+llm_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+# Each model's system prompt is a fixed prefix; a stable prompt_cache_key, bound
+# as a per-request parameter, routes its requests to the same cache so OpenAI's
+# automatic prefix caching hits
 planner_llm = ChatOpenAI(
     model=settings.planner_model,
     temperature=settings.planner_temperature,
     streaming=False,
     api_key=settings.openai_api_key,
-)
+    http_async_client=llm_http_client,
+).bind(prompt_cache_key="conditions-agent-planner")
 
 solver_llm = ChatOpenAI(
     model=settings.solver_model,
     temperature=settings.solver_temperature,
     streaming=False,
     api_key=settings.openai_api_key,
-)
-
+    http_async_client=llm_http_client,
+).bind(prompt_cache_key="conditions-agent-solver")
@@ -25,11 +25,14 @@ class Settings(BaseSettings):
     solver_model: str = "gpt-4o-mini"
     planner_temperature: float = 0.1
     solver_temperature: float = 0.3
+    rewoo_planner_mode: str = "auto"  # auto | always | never
+    rewoo_compact_evidence: bool = True  # False sends raw tool outputs to the solver (debugging)
 
     # PreConditions API (LangGraph Cloud)
     preconditions_deployment_url: Optional[str] = None
     preconditions_api_key: Optional[str] = None
     preconditions_assistant_id: Optional[str] = None
+    preconditions_cache_ttl_seconds: int = 60  # 0 disables prediction caching
     
     # Conditions AI (Airflow v5)
     conditions_ai_api_url: Optional[str] = None
@@ -46,13 +49,20 @@ class Settings(BaseSettings):
     
     # Database Configuration
     database_url: Optional[str] = None
+    # Per worker process: api_workers * (pool_size + max_overflow) must stay
+    # below Postgres max_connections (default 100; 4 * (10 + 10) = 80)
     database_pool_size: int = 10
-    database_max_overflow: int = 20
+    database_max_overflow: int = 10
+    database_pool_timeout: int = 30  # Seconds to wait for a free connection
+    database_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced
+    business_rules_cache_ttl_seconds: int = 60  # 0 disables business-rule caching
     
     # Agent Configuration
     confidence_threshold: float = 0.7
     max_execution_timeout_seconds: int = 30
     cost_budget_usd_per_execution: float = 5.0
+    result_cache_ttl_seconds: int = 3600  # 0 disables full-run result caching
+    result_cache_version: str = "1"  # Bump to invalidate cached results
     
     # API Configuration
     api_host: str = "0.0.0.0"
@@ -7,7 +7,7 @@ from typing import Optional
 from uuid import uuid4
 from sqlalchemy import (
     Column, String, Integer, DateTime, Text, Boolean, 
-    DECIMAL, ForeignKey, JSON
+    DECIMAL, ForeignKey, JSON, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
@@ -90,6 +90,11 @@ class LoanState(Base):
 class BusinessRule(Base):
     """Business rules configuration."""
     __tablename__ = "business_rules"
+    __table_args__ = (
+        # Serve get_active_rules ordered by priority DESC: with and without a rule_type filter
+        Index("idx_business_rules_active_type_priority", "active", "rule_type", "priority"),
+        Index("idx_business_rules_active_priority", "active", "priority"),
+    )
     
     rule_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
     rule_name = Column(String(255), nullable=False, unique=True)
@@ -2,12 +2,17 @@
 Database repository for CRUD operations.
 NOTE: This is a TEMPLATE and will be finalized later
 """
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
 from uuid import UUID, uuid4
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import NullPool
+from sqlalchemy import insert, lambda_stmt, make_url, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import raiseload
 
 from config.settings import settings
 from database.models import (
@@ -15,49 +20,78 @@ from database.models import (
     RMFeedback, LoanState, BusinessRule
 )
 
+# Business rules change rarely; cache lookups per process for a short TTL
+RULES_CACHE_SIZE = 256
+_MISS = object()
+
+
+def _async_database_url(url: str) -> URL:
+    """Point a postgresql:// URL at the asyncpg driver."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
 
 class DatabaseRepository:
-    """Repository for database operations."""
+    """
+    Repository for database operations (async, so DB waits never block the event loop).
+    
+    Objects are returned detached from their (closed) session. List queries
+    use raiseload("*") so touching a relationship that was not loaded fails
+    loudly instead of attempting implicit I/O.
+    """
     
     def __init__(self, database_url: Optional[str] = None):
         """Initialize database connection."""
-        url = database_url or settings.database_url
-        self.engine = create_engine(
+        url = _async_database_url(database_url or settings.database_url)
+        self.engine = create_async_engine(
             url,
             pool_size=settings.database_pool_size,
             max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=True,  # Replace connections dropped while idle in the pool
+            query_cache_size=1200,  # Compiled-statement cache (default 500)
             echo=False
         )
-        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._rules_cache: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, Any]]" = OrderedDict()
+        self._rules_lock = asyncio.Lock()
     
-    def create_tables(self):
+    async def create_tables(self):
         """Create all tables."""
-        Base.metadata.create_all(self.engine)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    
+    async def dispose(self):
+        """Close all pooled connections."""
+        await self.engine.dispose()
     
-    def get_session(self) -> Session:
+    def get_session(self) -> AsyncSession:
         """Get a database session."""
         return self.SessionLocal()
     
     # Agent Execution Operations
     
-    def create_execution(
+    async def create_execution(
         self,
         loan_guid: str,
         trace_id: Optional[str] = None
     ) -> AgentExecution:
         """Create a new agent execution record."""
-        with self.get_session() as session:
+        async with self.get_session() as session:
             execution = AgentExecution(
                 loan_guid=loan_guid,
                 trace_id=trace_id,
                 status="running"
             )
             session.add(execution)
-            session.commit()
-            session.refresh(execution)
+            await session.commit()
+            await session.refresh(execution)
             return execution
     
-    def update_execution_status(
+    async def update_execution_status(
         self,
         execution_id: UUID,
         status: str,
@@ -67,8 +101,8 @@ class DatabaseRepository:
         latency_ms: Optional[int] = None
     ) -> AgentExecution:
         """Update execution status and metrics."""
-        with self.get_session() as session:
-            execution = session.get(AgentExecution, execution_id)
+        async with self.get_session() as session:
+            execution = await session.get(AgentExecution, execution_id)
             if execution:
                 execution.status = status
                 execution.completed_at = datetime.utcnow()
@@ -80,67 +114,84 @@ class DatabaseRepository:
                     execution.cost_usd = cost_usd
                 if latency_ms is not None:
                     execution.latency_ms = latency_ms
-                session.commit()
-                session.refresh(execution)
+                await session.commit()
+                await session.refresh(execution)
             return execution
     
-    def get_execution(self, execution_id: UUID) -> Optional[AgentExecution]:
+    async def get_execution(self, execution_id: UUID) -> Optional[AgentExecution]:
         """Get execution by ID."""
-        with self.get_session() as session:
-            return session.get(AgentExecution, execution_id)
+        async with self.get_session() as session:
+            return await session.get(AgentExecution, execution_id)
     
     # Condition Evaluation Operations
     
-    def create_evaluations(
+    async def create_evaluations(
         self,
         execution_id: UUID,
-        evaluations: List[dict]
+        evaluations: Iterable[dict]
     ) -> List[ConditionEvaluation]:
-        """Create multiple condition evaluations."""
-        with self.get_session() as session:
-            eval_records = []
-            for eval_data in evaluations:
-                evaluation = ConditionEvaluation(
-                    execution_id=execution_id,
-                    condition_id=eval_data["condition_id"],
-                    condition_text=eval_data["condition_text"],
-                    result=eval_data["result"],
-                    confidence=eval_data.get("confidence"),
-                    model_used=eval_data.get("model_used"),
-                    reasoning=eval_data.get("reasoning"),
-                    citations=eval_data.get("citations")
-                )
-                session.add(evaluation)
-                eval_records.append(evaluation)
-            session.commit()
-            for record in eval_records:
-                session.refresh(record)
+        """Create multiple condition evaluations in one batched INSERT ... RETURNING."""
+        rows = [
+            {
+                "execution_id": execution_id,
+                "condition_id": eval_data["condition_id"],
+                "condition_text": eval_data["condition_text"],
+                "result": eval_data["result"],
+                "confidence": eval_data.get("confidence"),
+                "model_used": eval_data.get("model_used"),
+                "reasoning": eval_data.get("reasoning"),
+                "citations": eval_data.get("citations")
+            }
+            for eval_data in evaluations
+        ]
+        if not rows:
+            return []
+        
+        async with self.get_session() as session:
+            eval_records = list((await session.scalars(
+                insert(ConditionEvaluation).returning(ConditionEvaluation),
+                rows
+            )).all())
+            await session.commit()
             return eval_records
     
-    def get_evaluations_by_execution(
+    async def get_evaluations_by_execution(
         self,
         execution_id: UUID
     ) -> List[ConditionEvaluation]:
         """Get all evaluations for an execution."""
-        with self.get_session() as session:
-            stmt = select(ConditionEvaluation).where(
-                ConditionEvaluation.execution_id == execution_id
+        async with self.get_session() as session:
+            # Lambda statement: built and cache-keyed once, execution_id bound per call
+            stmt = lambda_stmt(
+                lambda: select(ConditionEvaluation)
+                .where(ConditionEvaluation.execution_id == execution_id)
+                .options(raiseload("*"))
             )
-            return list(session.scalars(stmt).all())
+            return list((await session.scalars(stmt)).all())
+    
+    async def evaluation_exists(self, evaluation_id: UUID) -> bool:
+        """Check whether an evaluation exists (without loading the row)."""
+        async with self.get_session() as session:
+            stmt = select(ConditionEvaluation.evaluation_id).where(
+                ConditionEvaluation.evaluation_id == evaluation_id
+            )
+            return await session.scalar(stmt) is not None
     
     # RM Feedback Operations
     
-    def create_feedback(
+    async def create_feedback(
         self,
         evaluation_id: UUID,
         rm_user_id: str,
         feedback_type: str,
         corrected_result: Optional[str] = None,
-        notes: Optional[str] = None
+        notes: Optional[str] = None,
+        feedback_id: Optional[UUID] = None
     ) -> RMFeedback:
-        """Create RM feedback."""
-        with self.get_session() as session:
+        """Create RM feedback (`feedback_id` lets callers assign the ID up front)."""
+        async with self.get_session() as session:
             feedback = RMFeedback(
+                feedback_id=feedback_id or uuid4(),
                 evaluation_id=evaluation_id,
                 rm_user_id=rm_user_id,
                 feedback_type=feedback_type,
@@ -148,13 +199,13 @@ class DatabaseRepository:
                 notes=notes
             )
             session.add(feedback)
-            session.commit()
-            session.refresh(feedback)
+            await session.commit()
+            await session.refresh(feedback)
             return feedback
     
     # Loan State Operations
     
-    def upsert_loan_state(
+    async def upsert_loan_state(
         self,
         loan_guid: str,
         current_status: str,
@@ -164,54 +215,126 @@ class DatabaseRepository:
         unsatisfied_count: int = 0,
         uncertain_count: int = 0
     ) -> LoanState:
-        """Create or update loan state."""
-        with self.get_session() as session:
-            loan_state = session.get(LoanState, loan_guid)
-            if loan_state:
-                loan_state.current_status = current_status
-                loan_state.last_execution_id = last_execution_id
-                loan_state.conditions_count = conditions_count
-                loan_state.satisfied_count = satisfied_count
-                loan_state.unsatisfied_count = unsatisfied_count
-                loan_state.uncertain_count = uncertain_count
-            else:
-                loan_state = LoanState(
-                    loan_guid=loan_guid,
-                    current_status=current_status,
-                    last_execution_id=last_execution_id,
-                    conditions_count=conditions_count,
-                    satisfied_count=satisfied_count,
-                    unsatisfied_count=unsatisfied_count,
-                    uncertain_count=uncertain_count
-                )
-                session.add(loan_state)
-            session.commit()
-            session.refresh(loan_state)
+        """Create or update loan state in one atomic INSERT ... ON CONFLICT DO UPDATE."""
+        stmt = pg_insert(LoanState).values(
+            loan_guid=loan_guid,
+            current_status=current_status,
+            last_execution_id=last_execution_id,
+            conditions_count=conditions_count,
+            satisfied_count=satisfied_count,
+            unsatisfied_count=unsatisfied_count,
+            uncertain_count=uncertain_count
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LoanState.loan_guid],
+            set_={
+                "current_status": stmt.excluded.current_status,
+                "last_execution_id": stmt.excluded.last_execution_id,
+                "conditions_count": stmt.excluded.conditions_count,
+                "satisfied_count": stmt.excluded.satisfied_count,
+                "unsatisfied_count": stmt.excluded.unsatisfied_count,
+                "uncertain_count": stmt.excluded.uncertain_count,
+                # Column onupdate defaults do not fire for ON CONFLICT updates
+                "updated_at": datetime.utcnow()
+            }
+        ).returning(LoanState)
+        
+        async with self.get_session() as session:
+            loan_state = (await session.scalars(stmt)).one()
+            await session.commit()
             return loan_state
     
-    def get_loan_state(self, loan_guid: str) -> Optional[LoanState]:
+    async def get_loan_state(self, loan_guid: str) -> Optional[LoanState]:
         """Get loan state by loan GUID."""
-        with self.get_session() as session:
-            return session.get(LoanState, loan_guid)
+        async with self.get_session() as session:
+            return await session.get(LoanState, loan_guid)
     
     # Business Rules Operations
     
-    def get_active_rules(self, rule_type: Optional[str] = None) -> List[BusinessRule]:
-        """Get active business rules, optionally filtered by type."""
-        with self.get_session() as session:
-            stmt = select(BusinessRule).where(BusinessRule.active == True)
-            if rule_type:
-                stmt = stmt.where(BusinessRule.rule_type == rule_type)
-            stmt = stmt.order_by(BusinessRule.priority.desc())
-            return list(session.scalars(stmt).all())
-    
-    def get_rule_by_name(self, rule_name: str) -> Optional[BusinessRule]:
-        """Get business rule by name."""
-        with self.get_session() as session:
-            stmt = select(BusinessRule).where(BusinessRule.rule_name == rule_name)
-            return session.scalars(stmt).first()
+    async def get_active_rules(self, rule_type: Optional[str] = None) -> List[BusinessRule]:
+        """Get active business rules, optionally filtered by type (cached for a short TTL)."""
+        async def load() -> List[BusinessRule]:
+            async with self.get_session() as session:
+                stmt = select(BusinessRule).where(BusinessRule.active == True).options(raiseload("*"))
+                if rule_type:
+                    stmt = stmt.where(BusinessRule.rule_type == rule_type)
+                stmt = stmt.order_by(BusinessRule.priority.desc())
+                return list((await session.scalars(stmt)).all())
+        
+        return list(await self._cached_rules_query(("active", rule_type or None), load))
+    
+    async def get_rule_by_name(self, rule_name: str) -> Optional[BusinessRule]:
+        """Get business rule by name (cached for a short TTL)."""
+        async def load() -> Optional[BusinessRule]:
+            async with self.get_session() as session:
+                stmt = select(BusinessRule).where(BusinessRule.rule_name == rule_name).options(raiseload("*"))
+                return (await session.scalars(stmt)).first()
+        
+        return await self._cached_rules_query(("name", rule_name), load)
+    
+    def invalidate_rules_cache(self):
+        """Drop cached business rules (call after writing to business_rules)."""
+        self._rules_cache.clear()
+    
+    def _get_cached_rules(self, key: Tuple[str, Optional[str]]) -> Any:
+        entry = self._rules_cache.get(key)
+        if entry is None:
+            return _MISS
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._rules_cache[key]
+            return _MISS
+        
+        self._rules_cache.move_to_end(key)
+        return value
+    
+    async def _cached_rules_query(
+        self,
+        key: Tuple[str, Optional[str]],
+        load: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Serve a business-rules query from the TTL cache, loading it on a miss.
+        
+        Misses are single-flight: concurrent callers wait on one lock and
+        re-check the cache, so a cold key costs one query, not one per caller.
+        Cached rows are detached ORM objects with all columns loaded.
+        """
+        ttl = settings.business_rules_cache_ttl_seconds
+        if ttl <= 0:
+            return await load()
+        
+        value = self._get_cached_rules(key)
+        if value is not _MISS:
+            return value
+        
+        async with self._rules_lock:
+            value = self._get_cached_rules(key)
+            if value is _MISS:
+                value = await load()
+                self._rules_cache[key] = (time.monotonic() + ttl, value)
+                if len(self._rules_cache) > RULES_CACHE_SIZE:
+                    self._rules_cache.popitem(last=False)
+        return value
+
+# Created on first use, so importing this module never builds an engine
+_repository: Optional[DatabaseRepository] = None
+
+
+def get_repository() -> DatabaseRepository:
+    """Return the process-wide repository, creating it on first call."""
+    global _repository
+    if _repository is None:
+        _repository = DatabaseRepository()
+    return _repository
+
 
+async def dispose_repository() -> None:
+    """Dispose the repository's pool if one was ever created."""
+    global _repository
+    if _repository is not None:
+        await _repository.dispose()
+        _repository = None
 
-# Global repository instance
-db_repository = DatabaseRepository()
 
@@ -92,6 +92,9 @@ CREATE TABLE IF NOT EXISTS business_rules (
 
 CREATE INDEX IF NOT EXISTS idx_business_rules_type ON business_rules(rule_type);
 CREATE INDEX IF NOT EXISTS idx_business_rules_active ON business_rules(active);
+-- Composite indexes for active-rule lookups (ORDER BY priority DESC), filtered by rule_type or not
+CREATE INDEX IF NOT EXISTS idx_business_rules_active_type_priority ON business_rules(active, rule_type, priority);
+CREATE INDEX IF NOT EXISTS idx_business_rules_active_priority ON business_rules(active, priority);
 
 -- =============================================================================
 -- Trigger for automatic updated_at timestamp updates
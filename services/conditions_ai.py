@@ -1,10 +1,13 @@
 """Conditions AI API client for Airflow v3 with S3 result fetching."""
 import asyncio
+import hashlib
 import json
-from typing import Dict, Any
+import logging
+from typing import Dict, Any, Optional
 from datetime import datetime
 import httpx
 import boto3
+import orjson
 from botocore.exceptions import ClientError
 
 from config.settings import settings
@@ -12,6 +15,10 @@ from utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# S3 objects larger than one window are fetched as concurrent range-GETs
+S3_RANGE_WINDOW = 16 * 1024 * 1024
+S3_RANGE_CONCURRENCY = 8
+
 
 class ConditionsAIClient:
     """Client for Conditions AI (Airflow v3 check_condition_v3 DAG)."""
@@ -20,13 +27,27 @@ class ConditionsAIClient:
         self,
         api_url: str = None,
         username: str = None,
-        password: str = None
+        password: str = None,
+        http_client: Optional[httpx.AsyncClient] = None
     ):
-        """Initialize client."""
+        """
+        Initialize client.
+        
+        Args:
+            api_url: Airflow API base URL
+            username: Airflow username
+            password: Airflow password
+            http_client: Shared AsyncClient to reuse; a pooled one is created if omitted
+        """
         self.api_url = api_url or settings.conditions_ai_api_url
         self.username = username or settings.airflow_username
         self.password = password or settings.airflow_password
-        self.http_client = httpx.AsyncClient(timeout=300.0)
+        self.http_client = http_client or httpx.AsyncClient(
+            timeout=300.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        # Running evaluations keyed by input hash, for request collapsing
+        self._inflight: Dict[str, asyncio.Future] = {}
         
         # Initialize S3 client
         # Priority: Role ARN > Temporary Credentials > Static Keys > Default Credential Chain
@@ -71,7 +92,67 @@ class ConditionsAIClient:
             logger.info("Creating S3 client with default credential chain")
             self.s3_client = boto3.client('s3', region_name=settings.aws_region)
     
+    async def warm_up(self):
+        """Open a pooled connection to Airflow so the first DAG trigger skips the TLS handshake."""
+        if not self.api_url:
+            return
+        
+        try:
+            await self.http_client.head(self.api_url, timeout=10.0)
+            logger.info("Conditions AI (Airflow) connection warmed up")
+        except Exception as e:
+            logger.warning(f"Conditions AI warm-up failed: {e}")
+    
     async def evaluate(
+        self,
+        conditions_ai_input: Dict[str, Any],
+        share_inflight: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Evaluate conditions, collapsing concurrent identical requests.
+        
+        Callers that submit the same conditions and documents while an
+        evaluation is already running (retries, double submits) await that
+        run instead of triggering another DAG. The shared run is shielded so
+        one caller going away does not cancel it for the others.
+        
+        A joined run writes only to the first caller's output_destination,
+        so callers that chose their own destination pass share_inflight=False.
+        
+        Args:
+            conditions_ai_input: Input in the format accepted by _evaluate
+            share_inflight: Join/offer this run for identical concurrent requests
+        
+        Returns:
+            Complete evaluation output from S3 (conditions_s3_output.json format)
+        """
+        if not share_inflight:
+            return await self._evaluate(conditions_ai_input)
+        
+        conf = conditions_ai_input.get("conf", conditions_ai_input)
+        key = hashlib.sha256(orjson.dumps(
+            [conf.get("conditions"), conf.get("s3_pdf_paths")],
+            option=orjson.OPT_SORT_KEYS,
+            default=str
+        )).hexdigest()
+        
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._evaluate(conditions_ai_input))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        else:
+            logger.info("Joining in-flight Conditions AI evaluation for identical input")
+        
+        return await asyncio.shield(task)
+    
+    def _finish_inflight(self, key: str, task: "asyncio.Future[Dict[str, Any]]") -> None:
+        """Drop a finished shared run and retrieve its exception (all awaiters may have gone)."""
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Shared Conditions AI evaluation failed: %s", task.exception())
+    
+    async def _evaluate(
         self,
         conditions_ai_input: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -159,7 +240,6 @@ class ConditionsAIClient:
             DAG run information including dag_run_id
         """
         logger.info("Triggering Airflow check_condition_v3 DAG")
-        logger.debug(f"DAG input: {json.dumps(conditions_ai_input, indent=2)}")
         
         url = f"{self.api_url}/api/v1/dags/check_condition_v3/dagRuns"
         
@@ -170,7 +250,9 @@ class ConditionsAIClient:
             "conf": dag_config
         }
         
-        logger.debug(f"DAG trigger payload: {json.dumps(payload, indent=2)}")
+        # Serializing the payload is O(conditions); only pay for it at DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("DAG trigger payload: %s", json.dumps(payload))
         
         try:
             response = await self.http_client.post(
@@ -313,15 +395,10 @@ class ConditionsAIClient:
             elapsed = (datetime.utcnow() - start_time).total_seconds()
             
             try:
-                # Try to fetch from S3 (synchronous boto3 call)
-                response = await asyncio.to_thread(
-                    self.s3_client.get_object,
-                    Bucket=bucket,
-                    Key=key
-                )
+                # Try to fetch from S3 (ranged reads for large outputs)
+                content = await self._read_s3_object(bucket, key)
                 
-                # Read and parse JSON
-                content = response['Body'].read().decode('utf-8')
+                # Parse JSON
                 results = json.loads(content)
                 
                 logger.info(f"Successfully fetched results from s3://{bucket}/{key} after {elapsed:.1f}s (attempt {attempt})")
@@ -353,6 +430,92 @@ class ConditionsAIClient:
                 logger.error(f"Error fetching S3 results: {e}", exc_info=True)
                 raise
     
+    async def _read_s3_object(self, bucket: str, key: str) -> bytes:
+        """
+        Read an S3 object, splitting large objects into concurrent range-GETs.
+        
+        The first window is requested directly; its Content-Range reveals the
+        total size, so no separate HeadObject round-trip is needed. Any
+        remaining windows are fetched in parallel (bounded by
+        S3_RANGE_CONCURRENCY) and concatenated in order.
+        
+        Args:
+            bucket: S3 bucket name
+            key: S3 object key
+        
+        Returns:
+            Object body as bytes
+        """
+        def get_range(start: int) -> Dict[str, Any]:
+            response = self.s3_client.get_object(
+                Bucket=bucket,
+                Key=key,
+                Range=f"bytes={start}-{start + S3_RANGE_WINDOW - 1}"
+            )
+            return {
+                "body": response['Body'].read(),
+                "content_range": response.get('ContentRange')
+            }
+        
+        first = await asyncio.to_thread(get_range, 0)
+        
+        # Content-Range looks like "bytes 0-16777215/67108864"
+        content_range = first["content_range"]
+        total_size = int(content_range.rsplit('/', 1)[1]) if content_range else len(first["body"])
+        
+        if total_size <= S3_RANGE_WINDOW:
+            return first["body"]
+        
+        semaphore = asyncio.Semaphore(S3_RANGE_CONCURRENCY)
+        
+        async def fetch_window(start: int) -> bytes:
+            async with semaphore:
+                window = await asyncio.to_thread(get_range, start)
+                return window["body"]
+        
+        logger.info(f"Fetching s3://{bucket}/{key} ({total_size} bytes) in {S3_RANGE_WINDOW} byte windows")
+        
+        rest = await asyncio.gather(*[
+            fetch_window(start)
+            for start in range(S3_RANGE_WINDOW, total_size, S3_RANGE_WINDOW)
+        ])
+        
+        return b"".join([first["body"], *rest])
+    
+    async def head_pdf(self, s3_path: str) -> Dict[str, Any]:
+        """
+        Fetch S3 object metadata for an uploaded PDF without downloading it.
+
+        Args:
+            s3_path: S3 path in format "s3://bucket/key" or "bucket/key"
+
+        Returns:
+            Dict with bucket, key, etag, content_length, content_type and last_modified
+        """
+        if s3_path.startswith('s3://'):
+            s3_path = s3_path[5:]
+
+        parts = s3_path.split('/', 1)
+        if len(parts) != 2:
+            raise ValueError(f"Invalid S3 path format: {s3_path}")
+
+        bucket, key = parts
+
+        response = await asyncio.to_thread(
+            self.s3_client.head_object,
+            Bucket=bucket,
+            Key=key
+        )
+
+        return {
+            "bucket": bucket,
+            "key": key,
+            "etag": response.get('ETag', '').strip('"'),
+            "content_length": response.get('ContentLength', 0),
+            "content_type": response.get('ContentType'),
+            "last_modified": response.get('LastModified')
+        }
+
     async def close(self):
         """Close HTTP client."""
         await self.http_client.aclose()
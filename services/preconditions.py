@@ -1,5 +1,11 @@
 """PreConditions API client for LangGraph Cloud."""
-from typing import Dict, Any
+import asyncio
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+import orjson
 from langgraph_sdk import get_client
 
 from config.settings import settings
@@ -7,6 +13,9 @@ from utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# LRU of recent predictions, keyed by a hash of the canonical input
+PREDICTION_CACHE_SIZE = 256
+
 
 class PreConditionsClient:
     """Client for PreConditions LangGraph Cloud API."""
@@ -28,6 +37,42 @@ class PreConditionsClient:
         self.deployment_url = deployment_url or settings.preconditions_deployment_url
         self.api_key = api_key or settings.preconditions_api_key
         self.assistant_id = assistant_id or settings.preconditions_assistant_id
+        self._client = None
+        self._client_loop = None
+        self._prediction_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+    
+    async def _get_client(self):
+        """
+        Get the LangGraph Cloud client, reusing its connection pool.
+        
+        The client is bound to the event loop it was created on, so a new
+        one is created if called from a different loop (the old one is
+        closed first so its pooled connections are not leaked).
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._client_loop is not loop:
+            try:
+                await self._client.aclose()
+            except Exception as e:
+                # Its connections belong to the old (possibly closed) loop
+                logger.warning(f"Failed to close PreConditions client from previous event loop: {e}")
+            self._client = None
+        if self._client is None:
+            self._client = get_client(url=self.deployment_url, api_key=self.api_key)
+            self._client_loop = loop
+        return self._client
+    
+    async def warm_up(self):
+        """Open a pooled connection so the first prediction skips the TLS handshake."""
+        if not self.deployment_url:
+            return
+        
+        try:
+            client = await self._get_client()
+            await client.http.get("/ok")
+            logger.info("PreConditions API connection warmed up")
+        except Exception as e:
+            logger.warning(f"PreConditions API warm-up failed: {e}")
     
     async def predict_conditions(self, preconditions_input: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -50,11 +95,25 @@ class PreConditionsClient:
                 - top_n: Top priority conditions
                 - execution_metadata: Tokens, cost, latency
         """
+        # Re-runs of the same loan (retries, re-evaluation) reuse a recent prediction
+        cache_key = hashlib.sha256(
+            orjson.dumps(preconditions_input, option=orjson.OPT_SORT_KEYS, default=str)
+        ).hexdigest()
+        cached = self._prediction_cache.get(cache_key)
+        if cached is not None:
+            expires_at, output = cached
+            if expires_at >= time.monotonic():
+                self._prediction_cache.move_to_end(cache_key)
+                logger.info("Reusing cached PreConditions prediction")
+                # Callers mutate the output (transform, state merges); never hand out the cached dict
+                return copy.deepcopy(output)
+            del self._prediction_cache[cache_key]
+        
         logger.info(f"Calling PreConditions API for classification: {preconditions_input.get('classification')}")
         
         try:
-            # Initialize LangGraph Cloud client
-            client = get_client(url=self.deployment_url, api_key=self.api_key)
+            # Get LangGraph Cloud client (pooled connections)
+            client = await self._get_client()
             
             # Create a thread for this execution
             thread = await client.threads.create()
@@ -83,16 +142,30 @@ class PreConditionsClient:
                 f"{len(output.get('compartments', []))} compartments"
             )
             
-            return output
-            
         except Exception as e:
             logger.error(f"Error calling PreConditions API: {e}", exc_info=True)
             raise Exception(f"PreConditions API call failed: {str(e)}")
+        
+        if settings.preconditions_cache_ttl_seconds > 0:
+            self._prediction_cache[cache_key] = (
+                time.monotonic() + settings.preconditions_cache_ttl_seconds,
+                copy.deepcopy(output)
+            )
+            if len(self._prediction_cache) > PREDICTION_CACHE_SIZE:
+                self._prediction_cache.popitem(last=False)
+        
+        return output
+    
+    def invalidate_cache(self):
+        """Drop cached predictions (e.g. after loan data changes upstream)."""
+        self._prediction_cache.clear()
     
     async def close(self):
-        """Close any open connections."""
-        # LangGraph SDK client doesn't require explicit closing
-        pass
+        """Close the pooled LangGraph Cloud client, if one was created."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
 
 
 # Global client instance
@@ -1,9 +1,22 @@
 import asyncio
+from pathlib import Path
 from typing import Any, Dict
 
+import orjson
 import pytest
 
-from agent.rewoo_graph import run_rewoo_agent
+from agent.rewoo_agent import (
+    _compact_tool_output,
+    _parse_plan_from_llm,
+    _plan_levels,
+    _should_call_planner_llm,
+    worker_node,
+)
+from agent.rewoo_graph import _state_delta, run_rewoo_agent
+from agent.tools import conditions_agent_tools
+from config.settings import settings
+
+FIXTURES_DIR = Path(__file__).parent
 
 
 @pytest.mark.asyncio
@@ -94,3 +107,242 @@ async def test_run_rewoo_agent_fallback(monkeypatch):
     assert results.get("not_fulfilled_count") == 0
     assert isinstance(results.get("conditions"), list)
 
+
+
+def test_plan_levels_group_independent_steps_before_dependents():
+    steps = [
+        {"id": "step_preconditions", "tool": "call_preconditions_api", "input": {}},
+        {"id": "step_s3", "tool": "retrieve_s3_document", "input": {"s3_path": "s3://demo-bucket/sample.pdf"}},
+        {"id": "step_conditions_ai", "tool": "call_conditions_ai_api", "input": {"from_step": "step_preconditions"}},
+        {"id": "step_db", "tool": "query_database", "input": {}},
+    ]
+
+    assert _plan_levels(steps) == [[0, 1, 3], [2]]
+
+
+def test_plan_levels_conditions_ai_without_source_waits_for_all_earlier_steps():
+    steps = [
+        {"id": "step_s3", "tool": "retrieve_s3_document", "input": {}},
+        {"id": "step_db", "tool": "query_database", "input": {}},
+        {"id": "step_conditions_ai", "tool": "call_conditions_ai_api", "input": {}},
+    ]
+
+    assert _plan_levels(steps) == [[0, 1], [2]]
+
+
+@pytest.mark.asyncio
+async def test_worker_runs_dependent_step_after_its_source(monkeypatch):
+    calls = []
+
+    async def fake_preconditions(_: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append("preconditions")
+        await asyncio.sleep(0.01)
+        return {"deficient_conditions": ["cond_001"]}
+
+    async def fake_s3(_: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append("s3")
+        return {"status": "accessible"}
+
+    async def fake_conditions_ai(payload: Dict[str, Any]) -> Dict[str, Any]:
+        calls.append("conditions_ai")
+        return {"received": payload["preconditions_output"]}
+
+    monkeypatch.setattr(conditions_agent_tools, "call_preconditions_api", fake_preconditions)
+    monkeypatch.setattr(conditions_agent_tools, "retrieve_s3_document", fake_s3)
+    monkeypatch.setattr(conditions_agent_tools, "call_conditions_ai_api", fake_conditions_ai)
+
+    state = {
+        "plan": {
+            "steps": [
+                {"id": "step_preconditions", "tool": "call_preconditions_api", "input": {}},
+                {"id": "step_s3", "tool": "retrieve_s3_document", "input": {}},
+                {"id": "step_conditions_ai", "tool": "call_conditions_ai_api", "input": {"from_step": "step_preconditions"}},
+            ]
+        },
+        "s3_pdf_paths": ["s3://demo-bucket/sample.pdf"],
+    }
+
+    result = await worker_node(state)
+
+    assert result["stage"] == "worker_complete"
+    assert calls[-1] == "conditions_ai"
+    assert result["evidence"]["step_conditions_ai"] == {"received": {"deficient_conditions": ["cond_001"]}}
+    assert [entry["step_id"] for entry in result["evidence_log"]] == [
+        "step_preconditions",
+        "step_s3",
+        "step_conditions_ai",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_worker_cancels_siblings_and_records_them_on_first_failure(monkeypatch):
+    sibling_cancelled = asyncio.Event()
+    dependent_called = False
+
+    async def failing_preconditions(_: Dict[str, Any]) -> Dict[str, Any]:
+        raise RuntimeError("PreConditions unavailable")
+
+    async def slow_s3(_: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            sibling_cancelled.set()
+            raise
+        return {"status": "accessible"}
+
+    async def fake_conditions_ai(_: Dict[str, Any]) -> Dict[str, Any]:
+        nonlocal dependent_called
+        dependent_called = True
+        return {}
+
+    monkeypatch.setattr(conditions_agent_tools, "call_preconditions_api", failing_preconditions)
+    monkeypatch.setattr(conditions_agent_tools, "retrieve_s3_document", slow_s3)
+    monkeypatch.setattr(conditions_agent_tools, "call_conditions_ai_api", fake_conditions_ai)
+
+    state = {
+        "plan": {
+            "steps": [
+                {"id": "step_preconditions", "tool": "call_preconditions_api", "input": {}},
+                {"id": "step_s3", "tool": "retrieve_s3_document", "input": {}},
+                {"id": "step_conditions_ai", "tool": "call_conditions_ai_api", "input": {"from_step": "step_preconditions"}},
+            ]
+        },
+    }
+
+    result = await asyncio.wait_for(worker_node(state), timeout=1)
+
+    assert sibling_cancelled.is_set()
+    assert not dependent_called
+    assert result["status"] == "failed"
+    assert result["error"] == "PreConditions unavailable"
+    # The failed step leaves no evidence; the cancelled sibling is logged as cancelled
+    assert result["evidence"] == {}
+    assert result["evidence_log"] == [
+        {
+            "step_id": "step_s3",
+            "tool": "retrieve_s3_document",
+            "output": {"status": "cancelled", "reason": "A concurrent step failed."},
+            "completed_at": result["evidence_log"][0]["completed_at"],
+        }
+    ]
+
+
+def _load_fixture(name: str) -> Dict[str, Any]:
+    return orjson.loads((FIXTURES_DIR / name).read_bytes())
+
+
+def test_state_delta_sends_only_changed_top_level_keys():
+    streamed: Dict[str, Any] = {}
+    plan = {"summary": "plan", "steps": []}
+
+    first = _state_delta({"plan": plan, "status": "running"}, streamed)
+    second = _state_delta({"plan": plan, "status": "completed"}, streamed)
+
+    assert first == {"plan": plan, "status": "running"}
+    assert second == {"status": "completed"}
+
+
+def test_state_delta_sends_changed_nested_values_whole():
+    streamed: Dict[str, Any] = {}
+    plan = {"summary": "plan", "steps": []}
+    _state_delta({"plan": plan, "status": "running"}, streamed)
+
+    final_results = {"status": "running", "plan": plan, "summary": "done"}
+    delta = _state_delta({"plan": plan, "final_results": final_results}, streamed)
+
+    # Nested keys that repeat a streamed top-level key are kept
+    assert delta == {"final_results": final_results}
+
+
+@pytest.mark.parametrize(
+    "raw_text",
+    [
+        '{"summary": "s", "steps": [{"tool": "query_database"}]}',
+        '```json\n{"summary": "s", "steps": [{"tool": "query_database"}]}\n```',
+        '```\n{"summary": "s", "steps": [{"tool": "query_database"}]}\n```',
+        '```json\n{"summary": "s", "steps": [{"tool": "query_database"}]}',
+    ],
+)
+def test_parse_plan_accepts_fenced_and_unfenced_json(raw_text):
+    plan = _parse_plan_from_llm(raw_text, {}, [])
+
+    assert plan == {
+        "summary": "s",
+        "steps": [{"id": "step_1", "description": "", "tool": "query_database", "input": {}}],
+    }
+
+
+def test_parse_plan_rejects_non_json():
+    assert _parse_plan_from_llm("```json\nnot json\n```", {}, []) is None
+
+
+def test_compact_tool_output_keeps_conditions_ai_summary_fields():
+    output = _load_fixture("conditions_s3_output.json")
+    compacted = _compact_tool_output(output)
+
+    assert compacted["processing_status"] == "completed"
+    assert "api_usage_summary" not in compacted
+    condition = compacted["processed_conditions"][0]
+    source = output["processed_conditions"][0]
+    assert condition == {
+        "condition_id": source["condition_id"],
+        "title": source["title"],
+        "document_status": source["document_status"],
+        "confidence": source["analysis_metadata"]["result_confidence"],
+        "document_analysis": source["document_analysis"],
+    }
+
+
+def test_compact_tool_output_keeps_no_relevant_documents_message():
+    output = {
+        "processed_conditions": [],
+        "processing_status": "completed_no_relevant_documents",
+        "message": "No documents were relevant.",
+        "api_usage_summary": {},
+    }
+
+    assert _compact_tool_output(output) == {
+        "processing_status": "completed_no_relevant_documents",
+        "message": "No documents were relevant.",
+        "processed_conditions": [],
+    }
+
+
+def test_compact_tool_output_reduces_preconditions_to_top_n():
+    output = _load_fixture("old_preconditions_output.json")
+    compacted = _compact_tool_output(output)
+
+    top_n = output["final_results"]["top_n"]
+    assert set(compacted) == {"compartments", "deficient_conditions", "summary"}
+    assert compacted["summary"] == output["final_results"]["summary"]
+    assert [item["condition_id"] for item in compacted["deficient_conditions"]] == [
+        item["condition_id"] for item in top_n
+    ]
+    assert set(compacted["deficient_conditions"][0]) == {
+        "condition_id",
+        "status",
+        "actionable_instruction",
+        "priority_score",
+    }
+
+
+def test_compact_tool_output_passes_unknown_outputs_through():
+    output = {"status": "accessible", "bucket": "demo-bucket"}
+
+    assert _compact_tool_output(output) is output
+
+
+@pytest.mark.parametrize(
+    ("mode", "instructions", "expected"),
+    [
+        ("always", "Evaluate the loan conditions.", True),
+        ("never", "Only check S3 access for the uploaded PDF.", False),
+        ("auto", None, False),
+        ("auto", "  Evaluate the loan conditions.  ", False),
+        ("auto", "Only check S3 access for the uploaded PDF.", True),
+    ],
+)
+def test_should_call_planner_llm_modes(monkeypatch, mode, instructions, expected):
+    monkeypatch.setattr(settings, "rewoo_planner_mode", mode)
+
+    assert _should_call_planner_llm(instructions) is expected
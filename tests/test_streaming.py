@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from utils.streaming import buffered, coalesced
+
+
+async def _numbers(n, fail_at=None):
+    for i in range(n):
+        if i == fail_at:
+            raise RuntimeError("boom")
+        await asyncio.sleep(0)
+        yield i
+
+
+@pytest.mark.asyncio
+async def test_buffered_preserves_order():
+    items = [item async for item in buffered(_numbers(10), maxsize=2)]
+    assert items == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_buffered_propagates_producer_error():
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        async for item in buffered(_numbers(10, fail_at=3)):
+            received.append(item)
+    assert received == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_buffered_cancels_producer_on_early_exit():
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    stream = buffered(endless(), maxsize=1)
+    async for item in stream:
+        if item == 2:
+            break
+    await stream.aclose()
+    assert closed.is_set()
+
+
+async def _frames(sizes, fail=False):
+    for size in sizes:
+        yield b"x" * size
+    if fail:
+        raise RuntimeError("boom")
+
+
+@pytest.mark.asyncio
+async def test_coalesced_merges_waiting_chunks_up_to_max_bytes():
+    stream = _frames([3000] * 4)
+    chunks = [chunk async for chunk in coalesced(stream, max_bytes=8192)]
+    assert b"".join(chunks) == b"x" * 12000
+    assert all(len(chunk) <= 9000 for chunk in chunks)
+    assert len(chunks) < 4
+
+
+@pytest.mark.asyncio
+async def test_coalesced_flushes_before_propagating_error():
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        async for chunk in coalesced(_frames([10, 10], fail=True)):
+            received.append(chunk)
+    assert b"".join(received) == b"x" * 20
@@ -0,0 +1,89 @@
+"""In-process cache of completed Conditions Agent runs."""
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import orjson
+
+from config.settings import settings
+from utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# LRU of final agent states, keyed by input hash; each entry records the PDF ETag it was computed from
+RESULT_CACHE_SIZE = 128
+_result_cache: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+
+
+def result_cache_key(preconditions_input: Dict[str, Any], s3_pdf_path: str) -> str:
+    """
+    Build the cache key for a full agent run.
+
+    The key covers the canonical JSON of the input, the PDF's S3 path and
+    the downstream versions (PreConditions assistant, Conditions AI
+    endpoint, cache version), so an upgraded model never serves a stale
+    result. The PDF's ETag is checked on lookup instead of being part of
+    the key, so a miss is known without an S3 HeadObject.
+
+    Args:
+        preconditions_input: Agent input (borrower info, classification, entities)
+        s3_pdf_path: S3 path to the uploaded PDF
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    version = "|".join([
+        settings.result_cache_version,
+        settings.preconditions_assistant_id or "",
+        settings.conditions_ai_api_url or ""
+    ])
+    return hashlib.sha256(
+        orjson.dumps(preconditions_input, option=orjson.OPT_SORT_KEYS, default=str)
+        + b"\0"
+        + s3_pdf_path.encode()
+        + b"\0"
+        + version.encode()
+    ).hexdigest()
+
+
+def _live_entry(key: str) -> Optional[Tuple[float, str, Dict[str, Any]]]:
+    entry = _result_cache.get(key)
+    if entry is None:
+        return None
+
+    if entry[0] < time.monotonic():
+        del _result_cache[key]
+        return None
+    return entry
+
+
+def has_cached_result(key: str) -> bool:
+    """Whether an unexpired result exists for `key` (for any PDF version)."""
+    return _live_entry(key) is not None
+
+
+def get_cached_result(key: str, pdf_etag: str) -> Optional[Dict[str, Any]]:
+    """Return a copy of the cached final state for `key`, or None if missing, expired or for another PDF version."""
+    entry = _live_entry(key)
+    if entry is None or entry[1] != pdf_etag:
+        return None
+
+    _result_cache.move_to_end(key)
+    return copy.deepcopy(entry[2])
+
+
+def store_result(key: str, pdf_etag: str, final_state: Dict[str, Any]) -> None:
+    """Cache a completed final state, computed from PDF version `pdf_etag`, for `settings.result_cache_ttl_seconds`."""
+    if settings.result_cache_ttl_seconds <= 0:
+        return
+
+    _result_cache[key] = (
+        time.monotonic() + settings.result_cache_ttl_seconds,
+        pdf_etag,
+        copy.deepcopy(final_state)
+    )
+    _result_cache.move_to_end(key)
+    if len(_result_cache) > RESULT_CACHE_SIZE:
+        _result_cache.popitem(last=False)
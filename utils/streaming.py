@@ -0,0 +1,121 @@
+"""Async streaming helpers."""
+import asyncio
+from typing import AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Raised:
+    """Wraps an exception raised by the producer so it can cross the queue."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+async def buffered(source: AsyncIterator[T], maxsize: int = 4) -> AsyncIterator[T]:
+    """
+    Read ahead from an async iterator into a bounded queue.
+
+    A background task drains `source` while the caller is still handling the
+    previous item (e.g. writing an SSE frame), so producer and consumer
+    overlap instead of strictly alternating. The queue size bounds how far
+    the producer can run ahead.
+
+    Args:
+        source: Async iterator to drain
+        maxsize: Maximum number of items buffered ahead of the consumer
+
+    Yields:
+        Items from `source`, in order. Exceptions raised by `source` are
+        re-raised to the caller.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    producer = _start_producer(source, queue)
+
+    try:
+        while True:
+            item = _unwrap(await queue.get())
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        await _stop_producer(producer)
+
+
+async def coalesced(
+    source: AsyncIterator[bytes],
+    max_bytes: int = 8192,
+    maxsize: int = 32
+) -> AsyncIterator[bytes]:
+    """
+    Merge byte chunks that are already waiting into larger writes.
+
+    Chunks that arrive back to back (e.g. solver token events) are joined up
+    to `max_bytes` per write, so a burst costs a few socket sends instead of
+    one per chunk. A lone chunk is passed on immediately - nothing waits for
+    more input - so interactive latency is unchanged.
+
+    Args:
+        source: Async iterator of encoded chunks (e.g. SSE frames)
+        max_bytes: Soft cap on the size of a merged write
+        maxsize: Maximum number of chunks buffered ahead of the consumer
+
+    Yields:
+        Concatenated chunks, in order. Exceptions raised by `source` are
+        re-raised after the chunks received before them.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    producer = _start_producer(source, queue)
+
+    try:
+        while True:
+            item = _unwrap(await queue.get())
+            if item is _DONE:
+                break
+            buffer = bytearray(item)
+            while len(buffer) < max_bytes and not queue.empty():
+                item = queue.get_nowait()
+                if item is _DONE or isinstance(item, _Raised):
+                    # Flush what we have before ending or re-raising
+                    queue.put_nowait(item)
+                    break
+                buffer += item
+            yield bytes(buffer)
+    finally:
+        await _stop_producer(producer)
+
+
+def _start_producer(source: AsyncIterator[T], queue: asyncio.Queue) -> asyncio.Task:
+    """Drain `source` into `queue` from a background task, ending with _DONE or _Raised."""
+    async def produce():
+        try:
+            async for item in source:
+                await queue.put(item)
+        except Exception as e:
+            await queue.put(_Raised(e))
+        else:
+            await queue.put(_DONE)
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    return asyncio.create_task(produce())
+
+
+def _unwrap(item):
+    """Re-raise a producer exception taken off the queue, otherwise return the item."""
+    if isinstance(item, _Raised):
+        raise item.exc
+    return item
+
+
+async def _stop_producer(producer: asyncio.Task) -> None:
+    """Stop the producer if the consumer goes away early (e.g. client disconnect)."""
+    producer.cancel()
+    try:
+        await producer
+    except asyncio.CancelledError:
+        pass
@@ -1,4 +1,5 @@
 """LangSmith tracing integration."""
+import asyncio
 import os
 from typing import Optional, Dict, Any
 from functools import wraps
@@ -89,10 +90,16 @@ def trace_agent_execution(name: str = None):
     """
     Decorator to trace agent execution with LangSmith.
     
+    When tracing is disabled the function is returned undecorated, so
+    nodes pay no wrapper or tagging overhead.
+    
     Args:
         name: Optional custom name for the trace
     """
     def decorator(func):
+        if not settings.langsmith_tracing_v2:
+            return func
+        
         @traceable(name=name or func.__name__)
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
@@ -134,7 +141,6 @@ def trace_agent_execution(name: str = None):
                 raise
         
         # Return appropriate wrapper based on whether function is async
-        import asyncio
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
         else:
@@ -8,6 +8,58 @@ from utils.logging_config import get_logger
 logger = get_logger(__name__)
 
 
+def _generate_output_destination(bucket: str) -> str:
+    """Generate a unique S3 output destination for a Conditions AI run."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{bucket}/conditions_output/result_{timestamp}_{uuid4().hex[:8]}.json"
+
+
+def _airflow_condition(idx: int, name: str, category: str, description: str) -> Dict[str, Any]:
+    """Build a single condition entry in the Airflow DAG input format."""
+    return {
+        "condition": {
+            "id": idx,
+            "name": name,
+            "data": {
+                "Title": name,
+                "Category": category,
+                "Description": description
+            }
+        }
+    }
+
+
+def _deficiency_to_airflow_condition(idx: int, cond: Dict[str, Any], category: str) -> Dict[str, Any]:
+    """Convert one PreConditions deficiency into an Airflow condition entry."""
+    # For top_n format: use condition_id and actionable_instruction directly
+    # (they're at the top level of each item in top_n)
+    condition_id = cond['condition_id'] if 'condition_id' in cond else f'cond_{idx}'
+    actionable_instruction = cond.get('actionable_instruction', '')
+    
+    # If actionable_instruction not at top level, check original_deficiency (fallback)
+    if not actionable_instruction and 'original_deficiency' in cond:
+        original = cond['original_deficiency']
+        actionable_instruction = original.get('actionable_instruction', '')
+    
+    # For raw deficient_conditions format (fallback)
+    if not actionable_instruction:
+        actionable_instruction = cond.get('condition_name', condition_id)
+    
+    # Sequential id for Airflow; PreConditions condition_id as name and title
+    return _airflow_condition(idx, condition_id, category, actionable_instruction)
+
+
+def _metadata_to_airflow_condition(idx: int, cond: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert one raw metadata condition into an Airflow condition entry."""
+    condition_name = cond['condition_name'] if 'condition_name' in cond else cond.get('name', '')
+    return _airflow_condition(
+        idx,
+        condition_name,
+        cond.get('category', 'General'),
+        cond.get('description', condition_name)
+    )
+
+
 def transform_preconditions_to_conditions_ai(
     cloud_output: Dict[str, Any],
     s3_pdf_path: str
@@ -55,36 +107,11 @@ def transform_preconditions_to_conditions_ai(
         deficient_conditions = cloud_output.get('deficient_conditions', [])
         logger.info(f"Using deficient_conditions with {len(deficient_conditions)} conditions (fallback)")
     
-    # Transform each condition to Airflow format
-    conditions = []
-    for idx, cond in enumerate(deficient_conditions, 1):
-        # Extract condition details
-        # For top_n format: use condition_id and actionable_instruction directly
-        # (they're at the top level of each item in top_n)
-        condition_id = cond.get('condition_id', f'cond_{idx}')
-        actionable_instruction = cond.get('actionable_instruction', '')
-        
-        # If actionable_instruction not at top level, check original_deficiency (fallback)
-        if not actionable_instruction and 'original_deficiency' in cond:
-            original = cond['original_deficiency']
-            actionable_instruction = original.get('actionable_instruction', '')
-        
-        # For raw deficient_conditions format (fallback)
-        if not actionable_instruction:
-            actionable_instruction = cond.get('condition_name', condition_id)
-        
-        airflow_condition = {
-            "condition": {
-                "id": idx,  # Sequential ID for Airflow
-                "name": condition_id,  # condition_id from PreConditions
-                "data": {
-                    "Title": condition_id,  # Same as name
-                    "Category": combined_category,  # All compartments combined
-                    "Description": actionable_instruction  # Actionable instruction
-                }
-            }
-        }
-        conditions.append(airflow_condition)
+    # Transform each condition to Airflow format (all compartments combined as the category)
+    conditions = [
+        _deficiency_to_airflow_condition(idx, cond, combined_category)
+        for idx, cond in enumerate(deficient_conditions, 1)
+    ]
     
     # Parse S3 path
     # Handle both formats: "s3://bucket/key" or just "bucket/key"
@@ -108,8 +135,7 @@ def transform_preconditions_to_conditions_ai(
     }]
     
     # Generate unique output destination
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_destination = f"{bucket}/conditions_output/result_{timestamp}_{uuid4().hex[:8]}.json"
+    output_destination = _generate_output_destination(bucket)
     
     # Build final Airflow input
     airflow_input = {
@@ -158,24 +184,10 @@ def transform_metadata_to_conditions_ai(
     logger.info(f"Found {len(raw_conditions)} conditions in metadata")
     
     # Transform each condition to Airflow format
-    conditions = []
-    for idx, cond in enumerate(raw_conditions, 1):
-        condition_name = cond.get('condition_name', cond.get('name', ''))
-        description = cond.get('description', condition_name)
-        category = cond.get('category', 'General')
-        
-        airflow_condition = {
-            "condition": {
-                "id": idx,
-                "name": condition_name,
-                "data": {
-                    "Title": condition_name,
-                    "Category": category,
-                    "Description": description
-                }
-            }
-        }
-        conditions.append(airflow_condition)
+    conditions = [
+        _metadata_to_airflow_condition(idx, cond)
+        for idx, cond in enumerate(raw_conditions, 1)
+    ]
     
     # Parse S3 paths to bucket/key format
     parsed_paths = []
@@ -196,9 +208,7 @@ def transform_metadata_to_conditions_ai(
     
     # Generate output destination if not provided
     if not output_destination:
-        first_bucket = parsed_paths[0]["bucket"]
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_destination = f"{first_bucket}/conditions_output/result_{timestamp}_{uuid4().hex[:8]}.json"
+        output_destination = _generate_output_destination(parsed_paths[0]["bucket"])
     
     # Build final Airflow input
     airflow_input = {
@@ -238,15 +248,12 @@ def extract_fulfilled_and_not_fulfilled(
     fulfilled = []
     not_fulfilled = []
     
+    # Single pass: anything not explicitly fulfilled ('not fulfilled',
+    # 'unfulfilled', uncertain or other status) needs review
     for cond in processed_conditions:
-        document_status = cond.get('document_status', '').lower()
-        
-        if document_status == 'fulfilled':
+        if cond.get('document_status', '').lower() == 'fulfilled':
             fulfilled.append(cond)
-        elif document_status in ['not fulfilled', 'not_fulfilled', 'unfulfilled']:
-            not_fulfilled.append(cond)
         else:
-            # Uncertain or other status - treat as not fulfilled (needs review)
             not_fulfilled.append(cond)
     
     logger.info(